@@ -1,7 +1,16 @@
+from bisect import bisect_left, bisect_right, insort
 from collections import UserDict
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
+import os
+import pickle
 import re
+import sys
+
+from fuzzy_index import BKTree, fuzzy_key
+from stats import STATS
+from persistence import (FileLock, append_json_lines, atomic_write, file_fingerprint, file_size, gc_paused,
+                         is_same_file, read_json_lines, remove_file)
 
 # Custom exceptions
 class TerribleException(Exception):
@@ -13,13 +22,103 @@ class ExcessiveArguments(Exception):
 class WrongArgumentFormat(Exception):
     pass
 
+# Errors the command decorator reports to the user instead of failing
+COMMAND_ERRORS = (TypeError, ValueError, IndexError, TerribleException, KeyError, ExcessiveArguments,
+                  WrongArgumentFormat)
+
+
+# Length of the substrings kept in the 'find' index
+NGRAM_SIZE = 3
+
+
+# All the n-grams of the text; texts shorter than NGRAM_SIZE are indexed whole
+def _ngrams(text: str) -> set:
+    if len(text) < NGRAM_SIZE:
+        return {text} if text else set()
+
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+# Keys of the name in the fuzzy index: the whole name and each of its words ("Olha_Petrenko" has two)
+def _fuzzy_keys(name: str) -> set:
+    return {fuzzy_key(name)} | {fuzzy_key(word) for word in re.findall(r'[^\W_]+', name)}
+
+
+# Searchable texts of the record, the same fields 'find' looks through
+def _record_texts(record) -> list:
+    texts = [record.name.value,
+             record.email.value if record.email else '',
+             record.address.value if record.address else '']
+    texts.extend(str(ph) for ph in record.phones)
+    return texts
+
+
+# Day of the birthday in a leap year (1..366), so 29 February has its own place in the index
+def _day_of_year(month: int, day: int) -> int:
+    return date(2000, month, day).timetuple().tm_yday
+
+
+# Same as calendar.isleap; importing calendar pulls in locale and slows the start down
+def _isleap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+# Date the birthday is celebrated in the year; 29 February moves to 1 March in common years
+def _birthday_in_year(bday: date, year: int) -> date:
+    if bday.month == 2 and bday.day == 29 and not _isleap(year):
+        return date(year, 3, 1)
+
+    return date(year, bday.month, bday.day)
+
+
+def _days_to_birthday(bday: date, today: date) -> int:
+    next_bday = _birthday_in_year(bday, today.year)
+
+    if next_bday < today:
+        next_bday = _birthday_in_year(bday, today.year + 1)
+
+    return (next_bday - today).days
+
+
+# The journal is folded back into save.json once it has more entries than this and than the book has records
+JOURNAL_COMPACT_MIN = 100
+
+
+# Bump when the layout of the rows in the binary snapshot changes
+CACHE_VERSION = 1
+
+
+# Ranges of the day-of-year keys for the birthdays in the next 'days' days, in the order they come
+def _birthday_key_ranges(days: int, today: date) -> list:
+    if days >= 365:
+        return [(1, 366)]
+
+    end = today + timedelta(days=days)
+    start_key = _day_of_year(today.month, today.day)
+    end_key = _day_of_year(end.month, end.day)
+
+    # in a common year 1 March is also the day of those born on 29 February
+    if today.month == 3 and today.day == 1 and not _isleap(today.year):
+        start_key -= 1
+
+    if end.year == today.year:
+        return [(start_key, end_key)]
+
+    return [(start_key, 366), (1, end_key)]
+
 
 # Universal decorator that catches general exceptions
 def command_phone_operations_check_decorator(func):
     def inner(*args, **kwargs) -> None:
 
         try:
-            func(*args, **kwargs)
+            try:
+                func(*args, **kwargs)
+            except COMMAND_ERRORS as error:
+                # errors that reach perform_command are already counted by its timer
+                if STATS.enabled and func.__name__ != 'perform_command':
+                    STATS.record_error('address_book', STATS.current[1] if STATS.current else func.__name__, error)
+                raise
 
         except TypeError:
             print('Argument type is not acceptable!')
@@ -49,96 +148,544 @@ def command_phone_operations_check_decorator(func):
 # Classes
 class AddressBook(UserDict):
 
-    def __init__(self):
+    def __init__(self, filename='save.json'):
         super().__init__()
+        self.filename = filename
+        self.journal_filename = f'{filename}.journal'
+        self.cache_filename = f'{filename}.cache'
         self.is_finished = False
-        self._load()
+        # names of the records changed or deleted since the last save -> True if the record was deleted and added
+        # again, so it goes to the end of the book
+        self._dirty = {}
+        self._journal_size = 0  # entries in the journal file
+        self._journal_offset = 0  # bytes of the journal this session has already applied
+        self._version = 0  # number of saves to the files (from the lock file) this session has seen
+        self._ngrams = None  # n-gram -> names of the records that contain it; built on the first search
+        self._record_ngrams = {}  # record name -> n-grams indexed for it
+        self._phones = {}  # normalized phone -> names of the records that have it
+        self._record_phones = {}  # record name -> phones indexed for it
+        self._bdays = None  # sorted (day of year, insertion number, record name); built on the first query
+        self._names = None  # sorted record names for paging; built on the first page
+        self._fuzzy = None  # BK-tree of the transliterated names; built on the first fuzzy search
+        self._record_bdays = {}  # record name -> its entry in self._bdays
+        self._order = {}  # record name -> insertion number, keeps 'find' output in book order
+        self._next_order = 0
+
+        with STATS.storage_timer('address_book', 'load'):
+            self._load()
         
     def add_record(self, record, *_):
-        self.data.update({record.name.value: record})
+        name = record.name.value
+
+        if name in self.data:
+            self._unindex_record(self.data[name])
+            self.data[name].book = None
+        else:
+            self._order[name] = self._next_order
+            self._next_order += 1
+            # deleted earlier in this session: the record now is at the end, not where save.json has it
+            if name in self._dirty:
+                self._dirty[name] = True
+
+            if self._names is not None:
+                insort(self._names, name)
+
+            self._fuzzy_add(name)
+
+        self.data.update({name: record})
+        record.book = self
+        self._index_record(record)
+        self._dirty.setdefault(name, False)
+
+    # adds many records in one go, e.g. from an import
+    def add_records(self, records):
+        with gc_paused():
+            for record in records:
+                self.add_record(record)
 
     def delete_record(self, contact_name):
         if str(contact_name) in self.data:
-            del self.data[str(contact_name)]
+            record = self.data.pop(str(contact_name))
+            self._unindex_record(record)
+            del self._order[str(contact_name)]
+            record.book = None
+
+            if self._names is not None:
+                del self._names[bisect_left(self._names, str(contact_name))]
+
+            self._fuzzy_discard(str(contact_name))
+
+            self._dirty.setdefault(str(contact_name), False)
             return None
 
+    # called by Record after any change of its fields
+    def _reindex_record(self, record):
+        self._unindex_record(record)
+        self._index_record(record)
+        self._dirty.setdefault(record.name.value, False)
+
+    # the n-gram and birthday indexes are kept up to date only after they were built
+    def _index_record(self, record):
+        name = record.name.value
+
+        phones = {str(ph) for ph in record.phones}
+
+        for phone in phones:
+            self._phones.setdefault(phone, set()).add(name)
+
+        self._record_phones[name] = phones
+
+        if self._ngrams is not None:
+            self._index_ngrams(record)
+
+        if self._bdays is not None and record.birthday:
+            entry = self._bday_entry(record)
+            insort(self._bdays, entry)
+            self._record_bdays[name] = entry
+
+    def _unindex_record(self, record):
+        name = record.name.value
+
+        for phone in self._record_phones.pop(name, ()):
+            names = self._phones[phone]
+            names.discard(name)
+            if not names:
+                del self._phones[phone]
+
+        for gram in self._record_ngrams.pop(name, ()):
+            names = self._ngrams[gram]
+            names.discard(name)
+            if not names:
+                del self._ngrams[gram]
+
+        entry = self._record_bdays.pop(name, None)
+        if entry is not None:
+            del self._bdays[bisect_left(self._bdays, entry)]
+
+    def _index_ngrams(self, record):
+        name = record.name.value
+        grams = set()
+
+        for text in _record_texts(record):
+            grams.update(_ngrams(text))
+
+        for gram in grams:
+            self._ngrams.setdefault(gram, set()).add(name)
+
+        self._record_ngrams[name] = grams
+
+    def _bday_entry(self, record) -> tuple:
+        name = record.name.value
+        return _day_of_year(record.birthday.value.month, record.birthday.value.day), self._order[name], name
+
+    def _build_ngrams(self):
+        if self._ngrams is None:
+            self._ngrams = {}
+            for record in self.data.values():
+                self._index_ngrams(record)
+
+    def _build_bdays(self):
+        if self._bdays is None:
+            self._record_bdays = {record.name.value: self._bday_entry(record)
+                                  for record in self.data.values() if record.birthday}
+            self._bdays = sorted(self._record_bdays.values())
+
+    # (days left, record) for the birthdays in the next 'days' days, the closest first
+    def birthdays_within(self, days, today=None) -> list:
+        today = today or date.today()
+        self._build_bdays()
+
+        entries = []
+        for start_key, end_key in _birthday_key_ranges(days, today):
+            entries.extend(self._bdays_between(start_key, end_key))
+
+        found = [(_days_to_birthday(self.data[name].birthday.value, today), self.data[name])
+                 for _, _, name in entries]
+
+        if days >= 365:
+            found.sort(key=lambda item: item[0])
+
+        return found
+
+    def _bdays_between(self, start_key, end_key) -> list:
+        low = bisect_left(self._bdays, (start_key,))
+        high = bisect_right(self._bdays, (end_key, float('inf')))
+        return self._bdays[low:high]
+
+    # (distance, record) for the names within the edit distance of the text, ignoring case and Cyrillic/Latin
+    # spelling; by default 1 typo is allowed in short names and 2 in longer ones
+    def fuzzy_search(self, text, max_distance=None) -> list:
+        if self._fuzzy is None:
+            self._fuzzy = BKTree()
+            for name in self.data:
+                self._fuzzy_add(name)
+
+        key = fuzzy_key(text)
+        if max_distance is None:
+            max_distance = 1 if len(key) <= 4 else 2
+
+        best = {}
+        for distance, _, names in self._fuzzy.search(key, max_distance):
+            for name in names:
+                best.setdefault(name, distance)
+
+        ranked = sorted(best.items(), key=lambda item: (item[1], item[0]))
+        return [(distance, self.data[name]) for name, distance in ranked]
+
+    # Groups (in book order) of the records that share a phone or an email, found with union-find in O(n)
+    def duplicate_groups(self) -> list:
+        names = []
+        parents = []
+        first_owner = {}  # normalized phone or casefolded email -> index of the first record that has it
+
+        def find_root(index):
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        for index, record in enumerate(self.data.values()):
+            names.append(record.name.value)
+            parents.append(index)
+
+            keys = {str(ph) for ph in record.phones}
+            if record.email and record.email.value:
+                keys.add(record.email.value.casefold())
+
+            for key in keys:
+                owner = first_owner.setdefault(key, index)
+                if owner != index:
+                    parents[find_root(index)] = find_root(owner)
+
+        groups = {}
+        for index, name in enumerate(names):
+            groups.setdefault(find_root(index), []).append(name)
+
+        return [[self.data[name] for name in group] for group in groups.values() if len(group) > 1]
+
+    # Moves phones and the missing email, address and birthday of the other records into the first one
+    def merge_records(self, records):
+        target, others = records[0], records[1:]
+
+        for record in others:
+            for phone in record.phones:
+                if str(phone) not in [str(ph) for ph in target.phones]:
+                    target.phones.append(phone)
+
+            if record.email and record.email.value and not (target.email and target.email.value):
+                target.email = record.email
+            if record.address and record.address.value and not (target.address and target.address.value):
+                target.address = record.address
+            if record.birthday and not target.birthday:
+                target.birthday = record.birthday
+
+            self.delete_record(record.name.value)
+
+        target._changed()
+        return target
+
+    def _fuzzy_add(self, name):
+        if self._fuzzy is not None:
+            for key in _fuzzy_keys(name):
+                self._fuzzy.add(key, name)
+
+    def _fuzzy_discard(self, name):
+        if self._fuzzy is not None:
+            for key in _fuzzy_keys(name):
+                self._fuzzy.discard(key, name)
+
+    # reverse lookup: records that have the phone, in book order
+    def find_by_phone(self, phone) -> list:
+        phone = Phone.normalize_phone(str(phone))
+        names = self._phones.get(phone, ())
+        return [self.data[name] for name in sorted(names, key=self._order.__getitem__)]
+
+    def has_phone(self, record_name, phone) -> bool:
+        return record_name in self._phones.get(Phone.normalize_phone(str(phone)), ())
+
+    def search(self, text) -> list:
+        if not text:
+            return list(self.data.values())
+
+        self._build_ngrams()
+
+        if len(text) >= NGRAM_SIZE:
+            postings = sorted((self._ngrams.get(gram, set()) for gram in _ngrams(text)), key=len)
+            candidates = set.intersection(*postings)
+        else:
+            # short query: scan the n-gram vocabulary instead of the records
+            candidates = set()
+            for gram, names in self._ngrams.items():
+                if text in gram:
+                    candidates.update(names)
+
+        # a full phone number in any of the accepted formats is looked up by its normalized form
+        phone = Phone.normalize_phone(text) if Phone.valid_phone(text) else None
+        owners = self._phones.get(phone, set())
+        candidates -= owners
+
+        found = [name for name in candidates
+                 if any(field.find(text) != -1 for field in _record_texts(self.data[name]))]
+        found.extend(owners)
+
+        return [self.data[name] for name in sorted(found, key=self._order.__getitem__)]
+
+    # Forgets the unsaved changes, so a later save does not write them
+    def _discard(self):
+        self._dirty.clear()
+
+    # Appends the changed records to the journal; save.json is rewritten only on compaction.
+    # Other sessions may have saved since this one loaded: their changes are merged in first,
+    # and on a conflict over the same record the change of this session wins as the later one
     def _save(self):
-        file_data = []
-        
-        for record in self.data.values():
-            write_dict = {}
-            write_dict["name"] = record.name.value
-            write_dict["Phone number"] = [str(ph) for ph in record.phones]
-            write_dict["Date of birth"] = record.birthday.value.strftime(
-                "%d %B %Y") if record.birthday else ''
-            write_dict["email"] = str(
-                record.email) if record.email else ''
-            write_dict["address"] = str(
-                record.address) if record.address else ''
-            file_data.append(write_dict)
-
-        with open('save.json', 'w') as writer:
-            json.dump(file_data, writer, indent=4)
-
-    def iterator(self, n):
-        counter = 0
-
-        if n > len(self.data):
-            n = len(self.data)
-            print(
-                f'Seems like there is only {len(self.data)} items in the book!')
-            counter = len(self.data) + 1
+        with FileLock(self.filename) as lock:
+            stamp = lock.read_stamp()
+
+            if stamp.get('version', 0) != self._version:
+                self._merge_saved(stamp)
+
+            entries = []
+
+            # in book order, so the replayed journal adds new records in the order they were added;
+            # a deleted and re-added record is deleted first, the put alone would keep its old place
+            for name in sorted(self._dirty, key=lambda name: self._order.get(name, -1)):
+                if name not in self.data or self._dirty[name]:
+                    entries.append({'op': 'delete', 'name': name})
+                if name in self.data:
+                    entries.append({'op': 'put', 'record': _record_to_dict(self.data[name])})
+
+            self._journal_size += append_json_lines(self.journal_filename, entries)
+            self._dirty.clear()
+            stamp['version'] = self._version = stamp.get('version', 0) + 1
+
+            if self._journal_size > max(JOURNAL_COMPACT_MIN, len(self.data)):
+                self._compact()
+                stamp['compacted'] = self._version
+
+            self._journal_offset = file_size(self.journal_filename)
+            lock.write_stamp(stamp)
+
+    # Applies what other sessions saved after this one last loaded or saved, keeping own unsaved changes
+    def _merge_saved(self, stamp):
+        if stamp.get('compacted', 0) <= self._version:
+            # only new journal entries since the known offset
+            self._apply_journal(read_json_lines(self.journal_filename, self._journal_offset))
+            return
 
-        for key, value in self.data.items():
-            recorded_phones = ''
-            recorded_phones = ', '.join([str(ph) for ph in value.phones])
-            print(f"{key}| Phones: {recorded_phones} | BDay: {value.birthday} | Email: {value.email} | Address: {value.address}")
-            counter += 1
+        # the journal this session knew was folded into a new save.json, compare the whole state
+        rows = self._read_rows()
+        journal = read_json_lines(self.journal_filename)
+
+        for entry in journal:
+            if entry['op'] == 'put':
+                rows[entry['record']['name']] = _row_from_dict(entry['record'])
+            else:
+                rows.pop(entry['name'], None)
+
+        for name in [name for name in self.data if name not in rows and name not in self._dirty]:
+            self.delete_record(name)
+            self._dirty.pop(name, None)
+
+        for name, row in rows.items():
+            if name not in self._dirty and (name not in self.data or _record_to_row(self.data[name]) != row):
+                self.add_record(_record_from_row(row))
+                self._dirty.pop(name, None)
+
+        self._journal_size = len(journal)
+
+    # Replays journal entries; records with unsaved changes of this session are left as they are
+    def _apply_journal(self, journal):
+        for entry in journal:
+            name = entry['record']['name'] if entry['op'] == 'put' else entry['name']
+
+            if name in self._dirty:
+                continue
+
+            if entry['op'] == 'put':
+                self.add_record(_record_from_row(_row_from_dict(entry['record'])))
+            else:
+                self.delete_record(name)
+
+            self._dirty.pop(name, None)
+
+        self._journal_size += len(journal)
+
+    # Folds the journal into a fresh save.json
+    def _compact(self):
+        file_data = [_record_to_dict(record) for record in self.data.values()]
+        content = json.dumps(file_data, indent=4).encode()
+        atomic_write(self.filename, content)
+        self._write_cache(file_fingerprint(self.filename, content))
+        remove_file(self.journal_filename)
+        self._journal_size = 0
+
+    # Binary snapshot of save.json: a header with the fingerprint of the JSON file, then the rows
+    def _write_cache(self, fingerprint):
+        rows = [_record_to_row(record) for record in self.data.values()]
+        content = pickle.dumps((CACHE_VERSION, fingerprint), protocol=5) + pickle.dumps(rows, protocol=5)
+        atomic_write(self.cache_filename, content)
+
+    # Rows of the binary snapshot, or None if it is missing or does not match save.json
+    def _read_cache(self):
+        try:
+            with open(self.cache_filename, 'rb') as reader:
+                version, fingerprint = pickle.load(reader)
 
-            if counter == n:
-                counter = 0
-                print('*' * 10)
-                yield
+                if version != CACHE_VERSION or not is_same_file(self.filename, fingerprint):
+                    return None
 
-        print('This was the end of the address book!')
-        return
+                return pickle.load(reader)
+
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+
+    # Records of one page sorted by name: page number 'page' (from 0) or, with 'after', the page after that name
+    def page(self, size, page=0, after=None) -> list:
+        names = self._sorted_names()
+        start = bisect_right(names, after) if after is not None else page * size
+        return [self.data[name] for name in names[start:start + size]]
+
+    # First 'limit' names that start with the prefix, in sorted order
+    def names_with_prefix(self, prefix, limit=20) -> list:
+        names = self._sorted_names()
+        start = bisect_left(names, prefix)
+        found = []
+
+        for name in names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            found.append(name)
+
+        return found
+
+    def _sorted_names(self) -> list:
+        if self._names is None:
+            self._names = sorted(self.data)
+
+        return self._names
     
-    def _load(self):     
+    def _load(self):
+        with FileLock(self.filename) as lock, gc_paused():
+            self._load_records()
+            self._version = lock.read_stamp().get('version', 0)
+
+    def _load_records(self):
+        rows = self._read_cache()
+
+        if rows is not None:
+            for row in rows:
+                self.add_record(_record_from_row(row))
+        else:
+            self._load_json()
+
+        self._dirty.clear()
+        self._journal_size = 0
+        self._apply_journal(read_json_lines(self.journal_filename))
+        self._journal_offset = file_size(self.journal_filename)
+
+    # Snapshot rows of save.json by name, read without touching the records of the book
+    def _read_rows(self) -> dict:
+        rows = self._read_cache()
+
+        if rows is None:
+            try:
+                with open(self.filename, 'rb') as reader:
+                    rows = [_row_from_dict(item) for item in json.loads(reader.read() or b'[]')]
+            except (FileNotFoundError, json.decoder.JSONDecodeError):
+                rows = []
+
+        return {row[0]: row for row in rows}
+
+    def _load_json(self):
 
         try:
-            with open('save.json') as reader:
-                try:
-                    file_data = json.load(reader)
-
-                    for item in file_data:
-                        name = Name(item['name'])
-                        row_phones = item['Phone number']
-                        row_email = Email(item['email'])
-                        row_address = Address(item['address'])
-                        record = Record(name,
-                                        Phone(row_phones[0]), row_email, row_address)
-                        
-                        iter = 1
-                        while iter < len(row_phones):
-                            record.add_phone(row_phones[iter])
-                            iter += 1
-
-                        if item['Date of birth'] == '':
-                            record.birthday = ''
-                        else:
-                            record.set_birthday(item['Date of birth'])
-
-                        self.data[item['name']] = record
-
-                except json.decoder.JSONDecodeError:
-                    file_data = []
-        
+            with open(self.filename, 'rb') as reader:
+                content = reader.read()
+
         except FileNotFoundError:
-            with open('save.json', 'w'):
+            with open(self.filename, 'w'):
                 ...
+            return
+
+        try:
+            file_data = json.loads(content)
+        except json.decoder.JSONDecodeError:
+            return
+
+        for item in file_data:
+            self.add_record(_record_from_dict(item))
+
+        self._write_cache(file_fingerprint(self.filename, content))
+
+
+def _record_to_dict(record) -> dict:
+    write_dict = {}
+    write_dict["name"] = record.name.value
+    write_dict["Phone number"] = [str(ph) for ph in record.phones]
+    write_dict["Date of birth"] = record.birthday.value.strftime(
+        "%d %B %Y") if record.birthday else ''
+    write_dict["email"] = str(
+        record.email) if record.email else ''
+    write_dict["address"] = str(
+        record.address) if record.address else ''
+    return write_dict
+
+
+# Compact form of the record for the binary snapshot
+def _record_to_row(record) -> tuple:
+    return (record.name.value,
+            tuple(str(ph) for ph in record.phones),
+            record.birthday.value.toordinal() if record.birthday else 0,
+            record.email.value if record.email else '',
+            record.address.value if record.address else '')
+
+
+# Restores the record from the snapshot row without validation, the values were checked before saving
+def _record_from_row(row):
+    name, phones, birthday, email, address = row
+    record = Record(Name(name), None, Email(email), Address(address))
+    # a record may have no phones left after 'delete phone'
+    record.phones[:] = [Phone(ph) for ph in phones]
+
+    if birthday:
+        record.birthday = Birthday(date.fromordinal(birthday))
+
+    return record
+
+
+# Snapshot row of a save.json item; its values were validated before they were saved
+def _row_from_dict(item) -> tuple:
+    birthday = item['Date of birth']
+    return (item['name'], tuple(item['Phone number']),
+            datetime.strptime(birthday, "%d %B %Y").date().toordinal() if birthday else 0,
+            item['email'], item['address'])
+
+
+def _record_from_dict(item):
+    name = Name(item['name'])
+    row_phones = item['Phone number']
+    row_email = Email(item['email'])
+    row_address = Address(item['address'])
+    record = Record(name,
+                    Phone(row_phones[0]) if row_phones else None, row_email, row_address)
+    if not row_phones:
+        record.phones.clear()
+    
+    iter = 1
+    while iter < len(row_phones):
+        record.add_phone(row_phones[iter])
+        iter += 1
+
+    if item['Date of birth'] == '':
+        record.birthday = ''
+    else:
+        record.set_birthday(item['Date of birth'])
+
+    return record
 
 
 class Record:
+    __slots__ = ('name', 'phones', 'email', 'address', 'birthday', 'book')
 
     def __init__(self, name, phone, email_value=None, address_value=None):
         self.name = name
@@ -156,6 +703,7 @@ class Record:
             self.address = address_value
 
         self.birthday = ''
+        self.book = None  # AddressBook that indexes this record
 
     def __repr__(self):
         return f"{self.name}; {self.phones}; {self.birthday if self.birthday else ''}; {self.email if self.email else ''}; {self.address if self.address else ''}"
@@ -166,8 +714,14 @@ class Record:
         # валидация висит на сеттере Phone
         new_phone.value = str(phone)
 
-        if new_phone.value not in [ph for ph in self.phones]:
+        if self.book is not None:
+            is_new = not self.book.has_phone(self.name.value, new_phone.value)
+        else:
+            is_new = new_phone.value not in [str(ph) for ph in self.phones]
+
+        if is_new:
             self.phones.append(new_phone)
+            self._changed()
             print(
                 f'{new_phone} record was successfully added for {self.name.value}')
         else:
@@ -178,28 +732,48 @@ class Record:
 
         new_phone_value = ''
 
+        if self.book is not None and not self.book.has_phone(self.name.value, Phone.convert_phone_number(old_phone)):
+            return new_phone_value
+
         for index, phone in enumerate(self.phones, 0):
 
             if phone.value == Phone.convert_phone_number(old_phone):
                 new_phone_value = input('Please input the new phone number: ')
                 new_phone_value = Phone.convert_phone_number(new_phone_value)
 
-                if Phone.valid_phone(new_phone_value): 
-                    self.phones[index] = new_phone_value
-                    break
-
-                else:
+                if not Phone.valid_phone(new_phone_value):
                     print('Number format is not correct! Must contain 10-13 symbols and must match the one of the current '
                   'formats: +380001112233 or 80001112233 or 0001112233!')
-                    break
+                    return None
+
+                new_phone = Phone(new_phone_value)
+
+                # як і add_phone, не дає записати номер, який уже є в контакті
+                if self.book is not None:
+                    is_new = not self.book.has_phone(self.name.value, new_phone.value)
+                else:
+                    is_new = new_phone.value not in [str(ph) for ph in self.phones]
+
+                if not is_new:
+                    print(f'{new_phone} is already actually recorded in {self.name.value}')
+                    return None
+
+                self.phones[index] = new_phone
+                self._changed()
+                break
 
         return new_phone_value
 
     def delete_phone(self, phone):
 
+        if self.book is not None and not self.book.has_phone(self.name.value, Phone.convert_phone_number(phone)):
+            print('No such phone record!')
+            return
+
         for index, record in enumerate(self.phones, 0):
-            if record == Phone.convert_phone_number(phone):
+            if str(record) == Phone.convert_phone_number(phone):
                 self.phones.pop(index)
+                self._changed()
                 print(f'{phone} was successfully deleted for {self.name.value}')
                 return
 
@@ -216,18 +790,38 @@ class Record:
             f'{self.name.value}\'s birthday will be roughly in {days_left} days! ({self.birthday.value.strftime("%d %B %Y")})')
 
     def set_birthday(self, date_val):
-        self.birthday = Birthday('')
-        self.birthday.value = date_val
+        birthday = Birthday('')
+        birthday.value = date_val
+        self.birthday = birthday
+        self._changed()
         print(f'{self.birthday} BDay record was added for {self.name.value}!')
 
     def set_email(self, email_val):
+        if self.email is None:
+            self.email = Email('')
+
         self.email.value = email_val
+        self._changed()
         print(f'{self.email} email record was added for {self.name.value}!')
 
+    def set_address(self, address_val):
+        if self.address is None:
+            self.address = Address('')
+
+        self.address.value = address_val
+        self._changed()
+
+    # keeps the indexes of the owning book up to date
+    def _changed(self):
+        if self.book is not None:
+            self.book._reindex_record(self)
+
 
 """Class Field виступає головним класом від якого наслідуються інші класи, такі як: Birthday, Name, Phone, Email, 
 Address. Використовується для приведення типів данних."""
 class Field:
+    # one slot instead of a __dict__ per field, the book keeps millions of them
+    __slots__ = ('_value',)
 
     def __init__(self, value):
         self._value = value
@@ -246,33 +840,23 @@ class Field:
 """Class Birthdaay наслідується від Field, приймає день народження формату str і повертає у вигляді date."""
 
 class Birthday(Field):
+    __slots__ = ()
 
     def __init__(self, value):
-        self.__value = value  # from 10 January 2020
+        self._value = value  # from 10 January 2020
 
     def _days_to_birthday(self):
-
-        datenow = datetime.now().date()
-        future_bday_date = datetime(
-            year=datenow.year, month=self.value.month, day=self.value.day).date()
-
-        if future_bday_date < datenow:
-            future_bday_date = datetime(
-                year=datenow.year + 1, month=self.value.month, day=self.value.day).date()
-
-        delta = future_bday_date - datenow
-        pure_days = delta.days % 365
-        return pure_days
+        return _days_to_birthday(self.value, date.today())
 
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, new_value):
 
         try:
-            self.__value = datetime.strptime(new_value, '%d %B %Y').date()
+            self._value = datetime.strptime(new_value, '%d %B %Y').date()
         except ValueError:
             print(
                 'Your data format is not correct! Please use this one: "10 January 2020"')
@@ -283,6 +867,7 @@ class Birthday(Field):
 
 """Class Name наслідується від Field, приймає ім'я формату str і повертає його."""
 class Name(Field):
+    __slots__ = ()
 
     def __init__(self, value):
         self._value = value
@@ -293,16 +878,17 @@ class Name(Field):
 """Class Phone наслідується від Field, приймає номер телефону формату str, проводить його валідацію на коректність 
 введення, конвертує його до формату +380999999999 та повертає у новому вигляді."""
 class Phone(Field):
+    __slots__ = ()
 
     def __init__(self, value):
-        self.__value = value
+        self._value = value
 
     def __repr__(self) -> str:
-        return f'{self.__value}'
+        return f'{self._value}'
 
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @staticmethod
     def valid_phone(phone: str):
@@ -317,18 +903,25 @@ class Phone(Field):
         else:
             return False
 
+    # same conversion as convert_phone_number, but silent: returns None for a wrong format
     @staticmethod
-    def convert_phone_number(phone: str):
-
-        correct_phone_number = ''
+    def normalize_phone(phone: str):
 
         if phone.startswith('+380') and len(phone) == 13:
-            correct_phone_number = phone
+            return phone
         elif phone.startswith('80') and len(phone) == 11:
-            correct_phone_number = '+3' + phone
+            return '+3' + phone
         elif phone.startswith('0') and len(phone) == 10:
-            correct_phone_number = '+38' + phone
-        else:
+            return '+38' + phone
+
+        return None
+
+    @staticmethod
+    def convert_phone_number(phone: str):
+
+        correct_phone_number = Phone.normalize_phone(phone)
+
+        if correct_phone_number is None:
             print('Number format is not correct! Must contain 10-13 symbols and must match the one of the current '
                   'formats: +380001112233 or 80001112233 or 0001112233!')
             raise WrongArgumentFormat
@@ -339,7 +932,7 @@ class Phone(Field):
     def value(self, new_value):
         is_valid = self.valid_phone(new_value)
         if is_valid:
-            self.__value = self.convert_phone_number(new_value)
+            self._value = self.convert_phone_number(new_value)
         else:
             print('Number format is not correct! Must contain 10-13 symbols and must match the one of the current '
                   'formats: +380001112233 or 80001112233 or 0001112233!')
@@ -348,16 +941,17 @@ class Phone(Field):
 """Class Email наслідується від Field, приймає емейл формату str, проводить його валідацію на коректність 
 введення та повертає."""
 class Email(Field):
+    __slots__ = ()
 
     def __init__(self, value):
-        self.__value = value
+        self._value = value
 
     def __repr__(self) -> str:
-        return f'{self.__value}'
+        return f'{self._value}'
 
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @staticmethod
     def valid_email(email: str):
@@ -371,7 +965,7 @@ class Email(Field):
     def value(self, new_value):
         is_valid = self.valid_email(new_value)
         if is_valid:
-            self.__value = new_value
+            self._value = new_value
         else:
             print('The email address is not valid! Must contain min 2 characters before "@" and 2-3 symbols in TLD! '
                   'Example: aa@example.net or aa@example.com.ua')
@@ -379,63 +973,74 @@ class Email(Field):
 
 """Class Address наслідується від Field, приймає адресу формату str та повертає."""
 class Address(Field):
+    __slots__ = ()
 
     def __init__(self, value):
-        self.__value = value
+        self._value = value
 
     def __repr__(self):
-        return f"{self.__value}"
+        return f"{self._value}"
 
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, new_value):
-        self.__value = new_value
+        self._value = new_value
 
 
-# Deconstructor that allows using commands with any number or keywords and with any number or passed parameters
+# Deconstructor that allows using commands with any number or keywords and with any number or passed parameters.
+# Walks the command trie token by token and takes the longest command the line starts with
 def deconstruct_command(input_line: str) -> list:
-    line_list = input_line.split(' ')
+    line_list = input_line.split()
 
-    if len(line_list) <= 0:
-        print('''Something REALLY unknown had happened during your command reading! Please stay  
-              calm and run out of the room!''')
-        return
+    if len(line_list) == 0:
+        return ['']
 
-    if len(line_list) == 1:
-        return line_list
+    node = command_trie
+    command = None
+    command_length = 0
 
-    old_complex_command = line_list[0].casefold()
-    new_line_list = line_list.copy()
+    for index, item in enumerate(line_list):
+        node = node.get(item.casefold())
 
-    for item in line_list:
+        if node is None:
+            break
 
-        if item.casefold() == old_complex_command:
-            new_line_list.remove(item)
-            continue
+        if None in node:
+            command = node[None]
+            command_length = index + 1
 
-        new_complex_command = old_complex_command + ' ' + item.casefold()
+    if command is None:
+        return line_list
 
-        if new_complex_command not in command_list:
-            new_line_list.insert(0, old_complex_command)
-            break
+    return [command] + line_list[command_length:]
 
-        new_line_list.remove(item)
-        old_complex_command = new_complex_command
 
-        if len(new_line_list) == 0:
-            new_line_list.insert(0, old_complex_command)
-            break
+# Token trie of the commands: word -> next words, the None key holds the command that ends at this word
+def build_command_trie(commands) -> dict:
+    trie = {}
+
+    for command in commands:
+        node = trie
+        for word in command.split():
+            node = node.setdefault(word, {})
+        node[None] = command
 
-    return new_line_list
+    return trie
 
 
 #Universal command performer/handler
 @command_phone_operations_check_decorator
 def perform_command(command: str, adr_book, *args, **kwargs) -> None | bool:
-    command_list[command](adr_book, *args, **kwargs)
+    if not STATS.enabled:
+        command_list[command](adr_book, *args, **kwargs)
+        return
+
+    # typos would each get their own metric otherwise
+    with STATS.command_timer('address_book', command if command in command_list else 'unknown'):
+        command_list[command](adr_book, *args, **kwargs)
 
 
 #curry functions
@@ -458,11 +1063,17 @@ def add_record(adr_book, line_list):
         else:  
             address.value += ' ' + item  
 
+    owners = [owner.name.value for owner in adr_book.find_by_phone(phone_number.value)
+              if owner.name.value != name.value]
+
     record = Record(name, phone_number, email, address)
     adr_book.add_record(record)
     print(
         f'Added record for {name.value} with {phone_number.value}, email \'{email.value}\', and address \'{address.value}\' my lord.')
 
+    if owners:
+        print(f'{phone_number.value} is also recorded for: {", ".join(owners)}')
+
 
 
 @command_phone_operations_check_decorator
@@ -481,6 +1092,12 @@ def add_phone(adr_book, line_list):
 
     adr_book.data[record_name].add_phone(phone)
 
+    owners = [owner.name.value for owner in adr_book.find_by_phone(phone)
+              if owner.name.value != record_name]
+
+    if owners:
+        print(f'{Phone.normalize_phone(phone)} is also recorded for: {", ".join(owners)}')
+
 
 @command_phone_operations_check_decorator
 def edit_phone(adr_book, line_list) -> None:
@@ -497,6 +1114,10 @@ def edit_phone(adr_book, line_list) -> None:
     old_phone = line_list[2]
     new_phone = adr_book.data[record_name].edit_phone(old_phone)
 
+    # None - the new number was rejected and the reason is already printed
+    if new_phone is None:
+        return
+
     if new_phone:
         print(f'{old_phone} was successfully changed to {new_phone} for {record_name}')
     else:
@@ -533,6 +1154,8 @@ def delete_record(adr_book, line_list):
 
 
 def close_without_saving(adr_book, *_):
+    adr_book._discard()
+    STATS.dump()
     adr_book.is_finished = True
     print('Will NOT save! BB!')
 
@@ -544,46 +1167,122 @@ def find(adr_book, line_list):
         raise ExcessiveArguments
 
     str_to_find = line_list[1]
-    is_empty = True
     print(f'Looking for {str_to_find}. Found...')
 
-    for record in adr_book.data.values():
+    found = adr_book.search(str_to_find)
 
+    for record in found:
         phones_string = ', '.join([str(ph) for ph in record.phones])
+        print(
+            f'Name: {record.name} | Phones: {phones_string} | Birthday: {record.birthday} | Email: {record.email} | Address: {record.address}')
 
-        if record.name.value.find(str_to_find) != -1:
-            is_empty = False
-            print(
-                f'Name: {record.name} | Phones: {phones_string} | Birthday: {record.birthday} | Email: {record.email} | Address: {record.address}')
-            continue
+    if not found:
+        print('Nothing!')
 
-        elif record.email.value.find(str_to_find) != -1:
-            is_empty = False
-            print(
-                f'Name: {record.name} | Phones: {phones_string} | Birthday: {record.birthday} | Email: {record.email} | Address: {record.address}')
-            continue
 
-        elif record.address.value.find(str_to_find) != -1:
-            is_empty = False
-            print(
-                f'Name: {record.name} | Phones: {phones_string} | Birthday: {record.birthday} | Email: {record.email} | Address: {record.address}')
-            continue
+@command_phone_operations_check_decorator
+def find_fuzzy(adr_book, line_list):
+    str_to_find = ' '.join(line_list[1:])
+    if not str_to_find:
+        raise IndexError
 
-        for phone in record.phones:
+    print(f'Looking for names like {str_to_find}. Found...')
 
-            if phone.value.find(str_to_find) != -1:
-                is_empty = False
-                print(
-                    f'Name: {record.name} | Phones: {phones_string} | Birthday: {record.birthday} | Email: {record.email} | Address: {record.address}')
-                break
+    found = adr_book.fuzzy_search(str_to_find)
 
-    if is_empty:
+    for distance, record in found:
+        phones_string = ', '.join([str(ph) for ph in record.phones])
+        print(
+            f'({distance}) Name: {record.name} | Phones: {phones_string} | Birthday: {record.birthday} | Email: {record.email} | Address: {record.address}')
+
+    if not found:
         print('Nothing!')
 
 
+@command_phone_operations_check_decorator
+def phone_owner(adr_book, line_list):
+    if len(line_list) > 2:
+        raise ExcessiveArguments
+
+    phone = Phone.convert_phone_number(line_list[1])
+    owners = adr_book.find_by_phone(phone)
+
+    if not owners:
+        print(f'Nobody has {phone}!')
+        return
+
+    for record in owners:
+        phones_string = ', '.join([str(ph) for ph in record.phones])
+        print(
+            f'Name: {record.name} | Phones: {phones_string} | Birthday: {record.birthday} | Email: {record.email} | Address: {record.address}')
+
+
+@command_phone_operations_check_decorator
+def import_file(adr_book, line_list, *_):
+    from contacts_import import import_contacts
+
+    filename = ' '.join(line_list[1:])
+    if not filename:
+        raise IndexError
+
+    try:
+        result = import_contacts(adr_book, filename)
+    except FileNotFoundError:
+        print(f'Cannot find file {filename}!')
+        return
+
+    print(f'Imported {result.imported} of {result.rows} records in {result.seconds:.2f} s '
+          f'({result.rows_per_second:.0f} rows/s).')
+
+    for number, error in result.errors[:10]:
+        print(f'Row {number}: {error}')
+
+    if len(result.errors) > 10:
+        print(f'...and {len(result.errors) - 10} more rows with errors.')
+
+    for number, name in result.duplicates[:10]:
+        print(f'Row {number}: {name} is already in the book, skipped')
+
+    if len(result.duplicates) > 10:
+        print(f'...and {len(result.duplicates) - 10} more rows with names already in the book.')
+
+
+@command_phone_operations_check_decorator
+def dedupe(adr_book, line_list, *_):
+    if len(line_list) > 1:
+        raise ExcessiveArguments
+
+    groups = adr_book.duplicate_groups()
+
+    if not groups:
+        print('No duplicates found!')
+        return
+
+    for number, group in enumerate(groups, 1):
+        print(f'{number}) ' + ' | '.join(
+            f'{record.name}: {", ".join(str(ph) for ph in record.phones)} {record.email or ""}'.strip() for record in group))
+
+    action = input('Merge into the first record of a group? (Y - all, N - none, or group numbers): ').casefold().split()
+
+    if action == ['y']:
+        chosen = range(1, len(groups) + 1)
+    elif all(item.isdigit() and 1 <= int(item) <= len(groups) for item in action) and action:
+        chosen = sorted({int(item) for item in action})
+    else:
+        print('Nothing was merged.')
+        return
+
+    for number in chosen:
+        record = adr_book.merge_records(groups[number - 1])
+        print(f'Merged {len(groups[number - 1])} records into {record.name}.')
+
+
 def finish_session(adr_book, *_) -> bool:
 
-    adr_book._save()
+    with STATS.storage_timer('address_book', 'save'):
+        adr_book._save()
+
+    STATS.dump()
     adr_book.is_finished = True
     print('Good bye!')
 
@@ -593,6 +1292,16 @@ def hello(*_) -> None:
     print('How can I help you?')
 
 
+def show_stats(*_) -> None:
+    if not STATS.enabled:
+        print('Statistics are off. Start with JASON_STATS=1 to collect them.')
+        return
+
+    print(STATS.report())
+    STATS.dump()
+    print(f'Saved in Prometheus format to {STATS.filename}')
+
+
 def help(*_):
     print(f'Available commands:')
     for command, description in command_description.items():
@@ -605,13 +1314,13 @@ def show_all_items(adr_book, *_) -> None:
         print('Your list is empty!')
         return
 
-    for record in adr_book.data:
-        if bool(adr_book.data[record].phones) == False:
-            print(f'Your list for {record} is empty!')
+    for record in adr_book.data.values():
+        if bool(record.phones) == False:
+            print(f'Your list for {record.name} is empty!')
             continue
 
-        print(f'Phones for {record} (email = "{adr_book.data[record].email.value}", address = "{adr_book.data[record].address.value}", BDay = "{adr_book.data[record].birthday}"):')
-        for id, phone in enumerate(adr_book.data[record].phones, 1):
+        print(f'Phones for {record.name} (email = "{record.email.value if record.email else ""}", address = "{record.address.value if record.address else ""}", BDay = "{record.birthday}"):')
+        for id, phone in enumerate(record.phones, 1):
             print(f'{id}) - {phone}')
 
 
@@ -632,58 +1341,78 @@ def show_bday_in_days(adr_book, line_list, *_) -> None:
         print('Timeframe could not be a negative number!')
         raise WrongArgumentFormat
 
-    datetime_timedelta = timedelta(days=int(days_timeframe))
-    is_empty = True
-
     print(f'You wanted to see Bdays in {days_timeframe} days! Here we go: ')
 
-    for record in adr_book.data.values():
+    found = adr_book.birthdays_within(days_timeframe)
 
-        if type(record.birthday) == str:
-            continue
+    for days_left, record in found:
 
-        record_timedelta = timedelta(days=record.birthday._days_to_birthday())
-
-        if record_timedelta <= datetime_timedelta:
-
-            recorded_phones = ', '.join([str(ph) for ph in record.phones])
+        recorded_phones = ', '.join([str(ph) for ph in record.phones])
 
-            print('=' * 10)
-            print(f'{record.name} will have a BDay in {record_timedelta.days}! ({record.birthday})')
-            print(f'His data: phones - {recorded_phones}, email - {record.email}, address - {record.address}')
+        print('=' * 10)
+        print(f'{record.name} will have a BDay in {days_left}! ({record.birthday})')
+        print(f'His data: phones - {recorded_phones}, email - {record.email}, address - {record.address}')
 
-            is_empty = False
-
-    if is_empty:
+    if not found:
         print('Sorry! Seems like nobody have BDays in the set timeframe!')
 
 
 @command_phone_operations_check_decorator
 def show_some_items(adr_book, *_):
 
-    n = input('How much records to show at a time? ')
-    print('*' * 10)
-    iterator = adr_book.iterator(int(n))
+    n = int(input('How much records to show at a time? '))
 
-    try:
-        next(iterator)
-    except StopIteration:
+    if n <= 0:
+        print('Number of records should be a positive number!')
+        raise WrongArgumentFormat
+
+    total = len(adr_book.data)
+
+    if total == 0:
+        print('Your list is empty!')
         return
 
+    if n > total:
+        print(f'Seems like there is only {total} items in the book!')
+
+    pages = (total + n - 1) // n
+    page = 0
+    records = adr_book.page(n)
+
     while True:
 
-        action = input('Show next part? (Y/N): ').casefold()
+        lines = ['*' * 10]
+        for record in records:
+            recorded_phones = ', '.join([str(ph) for ph in record.phones])
+            lines.append(f"{record.name}| Phones: {recorded_phones} | BDay: {record.birthday} | Email: {record.email} | Address: {record.address}")
+        lines.append('*' * 10)
 
-        if action == 'y':
-            try:
-                print('*' * 10)
-                next(iterator)
-            except StopIteration:
-                return
-        elif action == 'n':
+        if page == pages - 1:
+            lines.append('This was the end of the address book!')
+
+        # one write per page instead of a print per record
+        sys.stdout.write('\n'.join(lines) + '\n')
+
+        if page == pages - 1:
             return
-        else:
-            print('I do not understand the command!')
+
+        while True:
+
+            action = input(f'Page {page + 1} of {pages}. Show next part? (Y/N or page number): ').casefold()
+
+            if action == 'y':
+                # continue right after the last shown name
+                page += 1
+                records = adr_book.page(n, after=records[-1].name.value)
+                break
+            elif action == 'n':
+                return
+            elif action.isdigit() and 1 <= int(action) <= pages:
+                page = int(action) - 1
+                records = adr_book.page(n, page)
+                break
+            else:
+                print('I do not understand the command!')
 
 
 @command_phone_operations_check_decorator
@@ -726,7 +1455,7 @@ def set_address(adr_book, line_list, *_):
         print(f'Cannot find name {record_name} in the list!')
         return
     address_val = input('Please set the address: ')
-    adr_book.data[record_name].address = address_val
+    adr_book.data[record_name].set_address(address_val)
     print(f'Address {address_val} was set successfully for {record_name}!')
 
 
@@ -776,9 +1505,16 @@ command_list = {'not save': close_without_saving,
                 'show email': show_email,
                 'show address': show_address,
                 'find': find,
+                'find fuzzy': find_fuzzy,
+                'phone owner': phone_owner,
+                'dedupe': dedupe,
+                'stats': show_stats,
+                'import': import_file,
                 'help': help,
                 'bday in': show_bday_in_days}
 
+command_trie = build_command_trie(command_list)
+
 # command vocab with descriptions
 command_description = {'not save': 'Close adress book without saving',
                        'good bye': 'Save changes and close address book',
@@ -798,12 +1534,38 @@ command_description = {'not save': 'Close adress book without saving',
                        'show email': 'Show an email for the existing record',
                        'show address': 'Show an address for the existing record',
                        'find': 'Find record that contains ...',
+                       'find fuzzy': 'Find records with names like ..., also in Cyrillic or Latin spelling',
+                       'phone owner': 'Show records that have the phone',
+                       'dedupe': 'Find records with the same phone or email and merge them',
+                       'stats': 'Show command timings and errors of this session (with JASON_STATS=1)',
+                       'import': 'Import records from a CSV or vCard file',
                        'help': 'Show full list of available commands',
                        'bday in': 'Show records that have BDay in set timeframe of days'}
 
+# Book stored in the file: SQLite database for .db/.sqlite files, save.json with its journal otherwise
+def open_address_book(filename='save.json'):
+    if filename.endswith(('.db', '.sqlite', '.sqlite3')):
+        from address_book_sqlite import SqliteAddressBook
+        return SqliteAddressBook(filename)
+
+    return AddressBook(filename)
+
+
+# commands that take a record name as the first argument
+name_commands = {'add phone', 'edit phone', 'delete phone', 'delete contact', 'set bday', 'set email',
+                 'set address', 'show bday', 'show email', 'show address'}
+
+
 # main
 def main():
-    adr_book = AddressBook()
+    # JASON_ADDRESS_BOOK=contacts.db switches the book to the SQLite storage
+    adr_book = open_address_book(os.environ.get('JASON_ADDRESS_BOOK', 'save.json'))
+
+    # prompt_toolkit takes longer to import than the rest of the program, scripted sessions go without it
+    if sys.stdin.isatty():
+        from prompt_toolkit import prompt
+        from address_book_completer import AddressBookCompleter
+        completer = AddressBookCompleter(adr_book)
 
     print('*' * 10)
     hello()
@@ -814,7 +1576,12 @@ def main():
 
         print('*' * 10)
 
-        input_line = input('Put your request here: ')
+        # scripted input (not a terminal) is read without the interactive prompt
+        if sys.stdin.isatty():
+            input_line = prompt('Put your request here: ', completer=completer)
+        else:
+            input_line = input('Put your request here: ')
+
         line_list = deconstruct_command(input_line)
         current_command = line_list[0].casefold()
         perform_command(current_command, adr_book, line_list)
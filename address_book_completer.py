@@ -0,0 +1,32 @@
+from prompt_toolkit.completion import Completer, Completion
+
+from address_book import command_list, deconstruct_command, name_commands
+
+
+"""Class AddressBookCompleter підказує у промпті команди з command_list, а після команди - імена записів, що
+починаються з уже набраних символів. Імена шукаються бінарним пошуком у відсортованому індексі книги."""
+class AddressBookCompleter(Completer):
+
+    def __init__(self, adr_book):
+        self.adr_book = adr_book
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor.lstrip()
+        typed = ' '.join(text.casefold().split()) + (' ' if text[-1:].isspace() else '')
+
+        # still typing the command
+        commands = [known_command for known_command in command_list if known_command.startswith(typed)]
+        if commands:
+            for known_command in commands:
+                yield Completion(known_command, start_position=-len(text))
+            return
+
+        line_list = deconstruct_command(text)
+        command = line_list[0].casefold()
+        arguments = line_list[1:]
+        if text[-1:].isspace():
+            arguments.append('')
+
+        if command in name_commands and len(arguments) == 1:
+            for name in self.adr_book.names_with_prefix(arguments[0]):
+                yield Completion(name, start_position=-len(arguments[0]))
@@ -0,0 +1,242 @@
+from datetime import date
+from itertools import islice
+from operator import itemgetter
+
+from address_book import (AddressBook, NGRAM_SIZE, Phone, _birthday_key_ranges, _day_of_year, _days_to_birthday,
+                          _record_from_row, _record_texts, _record_to_row)
+from sqlite_storage import SqliteView, UnsavedChanges, connect, select_for_keys
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL DEFAULT '',
+    address TEXT NOT NULL DEFAULT '',
+    birthday INTEGER NOT NULL DEFAULT 0,
+    bday_doy INTEGER
+);
+CREATE INDEX IF NOT EXISTS records_email ON records (email);
+CREATE INDEX IF NOT EXISTS records_bday_doy ON records (bday_doy);
+CREATE TABLE IF NOT EXISTS phones (
+    record_id INTEGER NOT NULL REFERENCES records (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    phone TEXT NOT NULL,
+    PRIMARY KEY (record_id, position)
+);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones (phone);
+'''
+
+# Substring index for 'find'
+TEXT_INDEX_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS records_text USING fts5 (texts, tokenize = 'trigram case_sensitive 1')
+'''
+
+# Columns of the record rows, phones are glued in their order
+SELECT_RECORDS = '''
+SELECT id, name,
+       (SELECT group_concat(phone, ' ') FROM (SELECT phone FROM phones WHERE record_id = records.id ORDER BY position)),
+       birthday, email, address
+FROM records
+'''
+
+
+"""Class SqliteAddressBook зберігає записи у базі SQLite замість save.json. Записи читаються з бази лише тоді, коли
+потрібні, а пошук, дні народження та перегляд виконуються запитами до бази. Незбережені зміни сесії лежать у пам'яті
+(UnsavedChanges) і записуються до бази під час збереження."""
+class SqliteAddressBook(AddressBook):
+
+    def __init__(self, filename='save.db'):
+        self._changes = UnsavedChanges()
+        super().__init__(filename)
+
+    def _load(self):
+        self.connection, self.has_text_index = connect(self.filename, SCHEMA, TEXT_INDEX_SCHEMA)
+        self.data = SqliteView(self)
+
+    # Writes the changed records in one transaction; on a conflict over the same record the later save wins,
+    # as with save.json
+    def _save(self):
+        with self.connection:
+            for name, record in self._changes.in_order():
+                if record is None or self._changes.is_moved(name):
+                    self._delete_row(name)
+                if record is not None:
+                    self._write_record(record)
+
+        self._changes.clear()
+
+    def _discard(self):
+        self._changes.clear()
+        self._fuzzy = None
+
+    def add_record(self, record, *_):
+        if record.name.value not in self.data:
+            self._fuzzy_add(record.name.value)
+
+        record.book = self
+        self._changes.stage(record.name.value, record, self._saved_id)
+
+    def delete_record(self, contact_name):
+        if str(contact_name) in self.data:
+            self._fuzzy_discard(str(contact_name))
+            self._changes.stage(str(contact_name), None, self._saved_id)
+            return None
+
+    def _reindex_record(self, record):
+        self._changes.stage(record.name.value, record, self._saved_id)
+
+    def _put(self, name, record):
+        self.add_record(record)
+
+    def _remove(self, name):
+        self.delete_record(name)
+
+    def _delete_row(self, name):
+        record_id = self._saved_id(name)
+
+        if record_id is not None:
+            self.connection.execute('DELETE FROM records WHERE id = ?', (record_id,))
+            if self.has_text_index:
+                self.connection.execute('DELETE FROM records_text WHERE rowid = ?', (record_id,))
+
+    def _write_record(self, record):
+        name, phones, birthday, email, address = _record_to_row(record)
+        bday_doy = _birthday_key(record) if birthday else None
+
+        self.connection.execute(
+            'INSERT INTO records (name, email, address, birthday, bday_doy) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET email = excluded.email, address = excluded.address, '
+            'birthday = excluded.birthday, bday_doy = excluded.bday_doy',
+            (name, email, address, birthday, bday_doy))
+        record_id = self._saved_id(name)
+
+        self.connection.execute('DELETE FROM phones WHERE record_id = ?', (record_id,))
+        self.connection.executemany('INSERT INTO phones (record_id, position, phone) VALUES (?, ?, ?)',
+                                    [(record_id, position, phone) for position, phone in enumerate(phones)])
+
+        if self.has_text_index:
+            self.connection.execute('DELETE FROM records_text WHERE rowid = ?', (record_id,))
+            self.connection.execute('INSERT INTO records_text (rowid, texts) VALUES (?, ?)',
+                                    (record_id, '\n'.join(_record_texts(record))))
+
+    def _saved_id(self, name):
+        row = self.connection.execute('SELECT id FROM records WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def _saved_item(self, name):
+        return next((record for _, _, record in self._rows('WHERE name = ?', (name,))), None)
+
+    def _saved_rows(self):
+        return self._rows('ORDER BY id')
+
+    def _saved_keys(self):
+        return self.connection.execute('SELECT id, name FROM records ORDER BY id')
+
+    # Saved records, all of them or those with the given names
+    def _count_saved(self, names=None) -> int:
+        if names is None:
+            return self.connection.execute('SELECT count(*) FROM records').fetchone()[0]
+
+        return len(select_for_keys(self.connection, 'SELECT 1 FROM records WHERE name IN ({})', names))
+
+    # (id, name, record) for the rows of SELECT_RECORDS with the given condition, read in batches
+    def _rows(self, condition='', params=()):
+        cursor = self.connection.execute(SELECT_RECORDS + condition, params)
+
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+
+            for record_id, name, phones, birthday, email, address in rows:
+                # group_concat gives NULL for a record whose phones were all deleted
+                phones = tuple(phones.split(' ')) if phones else ()
+                record = _record_from_row((name, phones, birthday, email, address))
+                record.book = self
+                yield record_id, name, record
+
+    # Records of the query and the changed records for which matches(record) is true, in the order of sort
+    def _select(self, condition, params, matches, sort=itemgetter(0)) -> list:
+        changed = [row for row in self._changes.changed() if matches(row[2])]
+        return [record for _, _, record in self._changes.merge(self._rows(condition, params), changed, sort)]
+
+    def search(self, text) -> list:
+        if not text:
+            return list(self.data.values())
+
+        phone = Phone.normalize_phone(text) if Phone.valid_phone(text) else None
+
+        if self.has_text_index and len(text) >= NGRAM_SIZE:
+            condition = 'WHERE id IN (SELECT rowid FROM records_text WHERE records_text MATCH ?)'
+            params = ['"' + text.replace('"', '""') + '"']
+        else:
+            condition = ('WHERE instr(name, ?) OR instr(email, ?) OR instr(address, ?) '
+                         'OR id IN (SELECT record_id FROM phones WHERE instr(phone, ?))')
+            params = [text] * 4
+
+        condition += ' OR id IN (SELECT record_id FROM phones WHERE phone = ?) ORDER BY id'
+        return self._select(condition, params + [phone], lambda record: (
+            any(text in field for field in _record_texts(record)) or phone in [str(ph) for ph in record.phones]))
+
+    def page(self, size, page=0, after=None) -> list:
+        if after is not None:
+            condition, params, offset = 'WHERE name > ? ORDER BY name', [after], 0
+        else:
+            condition, params, offset = 'ORDER BY name', [], page * size
+
+        if not self._changes:
+            rows = self._rows(condition + ' LIMIT ? OFFSET ?', params + [size, offset])
+            return [record for _, _, record in rows]
+
+        changed = [row for row in self._changes.changed() if after is None or row[1] > after]
+        rows = self._changes.merge(self._rows(condition, params), changed, itemgetter(1))
+        return [record for _, _, record in islice(rows, offset, offset + size)]
+
+    def names_with_prefix(self, prefix, limit=20) -> list:
+        # the upper bound keeps the query on the name index, unlike LIKE 'prefix%'
+        if prefix:
+            condition = 'WHERE name >= ? AND name < ? ORDER BY name'
+            params = [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+        else:
+            condition, params = 'ORDER BY name', []
+
+        if not self._changes:
+            rows = self.connection.execute(f'SELECT name FROM records {condition} LIMIT ?', params + [limit])
+            return [name for (name,) in rows]
+
+        rows = ((None, name, name) for (name,) in self.connection.execute(f'SELECT name FROM records {condition}', params))
+        changed = [(None, name, name) for _, name, _ in self._changes.changed() if name.startswith(prefix)]
+        return [name for _, name, _ in islice(self._changes.merge(rows, changed, itemgetter(1)), limit)]
+
+    def find_by_phone(self, phone) -> list:
+        phone = Phone.normalize_phone(str(phone))
+        return self._select('WHERE id IN (SELECT record_id FROM phones WHERE phone = ?) ORDER BY id', (phone,),
+                            lambda record: phone in [str(ph) for ph in record.phones])
+
+    def has_phone(self, record_name, phone) -> bool:
+        phone = Phone.normalize_phone(str(phone))
+
+        if record_name in self._changes:
+            record = self._changes.items[record_name]
+            return record is not None and phone in [str(ph) for ph in record.phones]
+
+        row = self.connection.execute(
+            'SELECT 1 FROM phones JOIN records ON records.id = phones.record_id WHERE name = ? AND phone = ?',
+            (record_name, phone)).fetchone()
+        return row is not None
+
+    def birthdays_within(self, days, today=None) -> list:
+        today = today or date.today()
+        found = []
+
+        for start_key, end_key in _birthday_key_ranges(days, today):
+            found.extend(self._select('WHERE bday_doy BETWEEN ? AND ? ORDER BY id', (start_key, end_key), lambda record: (
+                record.birthday and start_key <= _birthday_key(record) <= end_key)))
+
+        # the closest first; 29 February goes before 1 March that it is celebrated on in a common year
+        found.sort(key=lambda record: (_days_to_birthday(record.birthday.value, today), _birthday_key(record)))
+        return [(_days_to_birthday(record.birthday.value, today), record) for record in found]
+
+
+def _birthday_key(record) -> int:
+    return _day_of_year(record.birthday.value.month, record.birthday.value.day)
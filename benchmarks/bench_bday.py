@@ -0,0 +1,21 @@
+# Latency of 'bday in' queries (day-of-year index) for different book sizes.
+# Usage: python benchmarks/bench_bday.py [size ...]
+import sys
+
+from bench_find import timed
+from generators import build_book
+
+
+def main(sizes):
+    print(f'{"size":>8} {"days":>6} {"hits":>6} {"index ms":>10}')
+
+    for size in sizes:
+        book = build_book(size)
+
+        for days in (0, 7, 30):
+            hits = len(book.birthdays_within(days))
+            print(f'{size:>8} {days:>6} {hits:>6} {timed(book.birthdays_within, days):>10.3f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,43 @@
+# Latency of the address book prompt completion (names by prefix) per keystroke, for different book sizes.
+# Usage: python benchmarks/bench_complete.py [size ...]
+import random
+import sys
+import time
+
+from prompt_toolkit.document import Document
+
+from generators import build_book
+
+from address_book_completer import AddressBookCompleter
+
+
+def main(sizes):
+    print(f'{"size":>8} {"first ms":>10} {"per keystroke ms":>17}')
+
+    for size in sizes:
+        book = build_book(size)
+        completer = AddressBookCompleter(book)
+        rnd = random.Random(size)
+        names = list(book.data)
+
+        # the first completion sorts the names
+        start = time.perf_counter()
+        list(completer.get_completions(Document('show email O'), None))
+        first_ms = (time.perf_counter() - start) * 1000
+
+        # typing a name letter by letter
+        lines = []
+        for _ in range(200):
+            name = rnd.choice(names)
+            lines.extend(f'show email {name[:length]}' for length in range(1, len(name) + 1))
+
+        start = time.perf_counter()
+        for line in lines:
+            list(completer.get_completions(Document(line), None))
+        per_keystroke_ms = (time.perf_counter() - start) / len(lines) * 1000
+
+        print(f'{size:>8} {first_ms:>10.1f} {per_keystroke_ms:>17.4f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000])
@@ -0,0 +1,56 @@
+# Replays a scripted command stream through the address book dispatcher and reports the dispatch overhead.
+# Usage: python benchmarks/bench_dispatch.py [commands]
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from address_book import AddressBook, deconstruct_command, perform_command
+
+
+# Non-interactive commands, the ones automation would send
+def command_stream(count, seed=0):
+    rnd = random.Random(seed)
+    lines = []
+
+    for i in range(count):
+        name = f'Contact{rnd.randrange(count // 4 + 1)}'
+        phone = f'0{rnd.randrange(10 ** 9):09d}'
+        lines.append(rnd.choice([
+            f'add {name} {phone} {name.lower()}@mail.com Sadova  {i % 300}',
+            f'add phone {name} {phone}',
+            f'find {name}',
+            f'phone owner {phone}',
+            f'bday in {rnd.randrange(30)}',
+            f'show email {name}',
+            f'delete contact {name}',
+        ]))
+
+    return lines
+
+
+def main(count):
+    lines = command_stream(count)
+    book = AddressBook(os.path.join(tempfile.mkdtemp(), 'save.json'))
+
+    start = time.perf_counter()
+    parsed = [deconstruct_command(line) for line in lines]
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for line_list in parsed:
+            perform_command(line_list[0].casefold(), book, line_list)
+    run_seconds = time.perf_counter() - start
+
+    print(f'{count} commands: parsing {parse_seconds / count * 1e6:.2f} us/command, '
+          f'whole replay {count / run_seconds:.0f} commands/s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,37 @@
+# Latency of the address book 'find' (n-gram index) against a full scan for different book sizes.
+# Usage: python benchmarks/bench_find.py [size ...]
+import sys
+import time
+
+from generators import build_book
+
+from address_book import _record_texts
+
+
+def scan(book, text):
+    return [record for record in book.data.values()
+            if any(field.find(text) != -1 for field in _record_texts(record))]
+
+
+def timed(func, *args, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(sizes):
+    queries = ['Petrenko12345', 'enko9', '4520', 'Sadova, 17']
+    print(f'{"size":>8} {"query":>14} {"hits":>6} {"index ms":>10} {"scan ms":>10}')
+
+    for size in sizes:
+        book = build_book(size)
+
+        for query in queries:
+            hits = len(book.search(query))
+            print(f'{size:>8} {query:>14} {hits:>6} {timed(book.search, query):>10.3f} '
+                  f'{timed(scan, book, query, repeat=3):>10.3f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
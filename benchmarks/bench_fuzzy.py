@@ -0,0 +1,33 @@
+# Latency of 'find fuzzy' (BK-tree) against computing the edit distance to every name.
+# Usage: python benchmarks/bench_fuzzy.py [size ...]
+import sys
+
+from bench_find import timed
+from generators import build_book, contact_rows
+
+from fuzzy_index import fuzzy_key, levenshtein
+
+
+def scan(book, text):
+    key = fuzzy_key(text)
+    return [name for name in book.data if levenshtein(key, fuzzy_key(name)) <= 2]
+
+
+def main(sizes):
+    print(f'{"size":>8} {"hits":>6} {"bk-tree ms":>11} {"scan ms":>10}')
+
+    for size in sizes:
+        book = build_book(size)
+
+        # Latin spelling of a name from the book, with one letter missing
+        key = fuzzy_key(next(contact_rows(1))[0])
+        query = key[:3] + key[4:]
+
+        book.fuzzy_search('x')  # builds the tree
+        hits = len(book.fuzzy_search(query))
+        print(f'{size:>8} {hits:>6} {timed(book.fuzzy_search, query):>11.2f} '
+              f'{timed(scan, book, query, repeat=1):>10.2f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,28 @@
+# Throughput of the bulk CSV import, in rows per second, with and without worker processes.
+# Usage: python benchmarks/bench_import.py [size ...]
+import os
+import sys
+import tempfile
+
+from generators import write_contacts_csv
+
+from address_book import AddressBook
+from contacts_import import import_contacts
+
+
+def main(sizes):
+    print(f'{"size":>8} {"workers":>8} {"errors":>7} {"rows/s":>10}')
+    folder = tempfile.mkdtemp()
+
+    for size in sizes:
+        filename = os.path.join(folder, f'contacts{size}.csv')
+        write_contacts_csv(filename, size)
+
+        for workers in (1, None):
+            book = AddressBook(os.path.join(folder, f'save{size}{workers}.json'))
+            result = import_contacts(book, filename, workers)
+            print(f'{size:>8} {workers or os.cpu_count():>8} {len(result.errors):>7} {result.rows_per_second:>10.0f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
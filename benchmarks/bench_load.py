@@ -0,0 +1,36 @@
+# AddressBook startup time: parsing save.json against loading the binary snapshot next to it.
+# Usage: python benchmarks/bench_load.py [size ...]
+import contextlib
+import io
+import os
+import sys
+import time
+
+from generators import build_book
+
+from address_book import AddressBook
+
+
+def load_time(filename):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        AddressBook(filename)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(sizes):
+    print(f'{"size":>8} {"json ms":>10} {"snapshot ms":>12}')
+
+    for size in sizes:
+        book = build_book(size)
+        book._compact()
+
+        os.remove(book.cache_filename)
+        json_ms = load_time(book.filename)  # parses save.json and writes the snapshot
+        snapshot_ms = load_time(book.filename)
+
+        print(f'{size:>8} {json_ms:>10.1f} {snapshot_ms:>12.1f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,62 @@
+# Memory taken by the contacts of the address book, in bytes per contact: the Record and Field classes with
+# __slots__ against dict-backed copies of them, as they were before, built from the same rows.
+# Usage: python benchmarks/bench_memory.py [size ...]
+from datetime import date
+import sys
+import tracemalloc
+
+from generators import contact_rows
+from address_book import _record_from_row
+
+
+# Copies of Field and Record without __slots__: the same attributes, kept in a __dict__ of every instance
+class DictField:
+
+    def __init__(self, value):
+        self._value = value
+
+
+class DictRecord:
+
+    def __init__(self, name, email, address):
+        self.name = name
+        self.phones = []
+        self.email = email
+        self.address = address
+        self.birthday = None
+        self.book = None
+
+
+# The same as _record_from_row, with the dict-backed copies
+def _dict_record_from_row(row):
+    name, phones, birthday, email, address = row
+    record = DictRecord(DictField(name), DictField(email), DictField(address))
+    record.phones[:] = [DictField(phone) for phone in phones]
+    if birthday:
+        record.birthday = DictField(date.fromordinal(birthday))
+    return record
+
+
+def build_records(size, record_from_row=_record_from_row):
+    return [record_from_row(row) for row in contact_rows(size)]
+
+
+# Bytes per contact the records built by record_from_row take
+def measure(size, record_from_row) -> float:
+    tracemalloc.start()
+    records = build_records(size, record_from_row)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used / len(records)
+
+
+def main(sizes):
+    print(f'{"size":>8} {"__dict__":>10} {"__slots__":>10} {"ratio":>6}   (bytes/contact)')
+    for size in sizes:
+        dict_backed = measure(size, _dict_record_from_row)
+        slotted = measure(size, _record_from_row)
+        print(f'{size:>8} {dict_backed:>10.0f} {slotted:>10.0f} {slotted / dict_backed:>6.2f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,141 @@
+# Load generator for jason_server: concurrent clients send a mix of reads and writes over localhost TCP
+# and the requests per second and latency percentiles are reported.
+# Usage: python benchmarks/bench_server.py [clients] [requests per client]
+from multiprocessing import Process
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jason_server
+
+# Share of each method in the load; the rest of the calls are 'find'
+MIX = [('add', 0.15), ('add_note', 0.05), ('bday_in', 0.1), ('search_notes', 0.1), ('sort_by_tag', 0.05)]
+
+# Contacts and notes put in before the measured run, so the reads have something to look through
+PRELOAD = 1000
+
+# 'find' answers with every matching contact, a line can be far longer than the 64 KiB asyncio allows by default
+RESPONSE_LIMIT = 2 ** 24
+
+
+def run_server(port, folder):
+    asyncio.run(jason_server.serve(port, os.path.join(folder, 'save.json'), os.path.join(folder, 'notes.json')))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_call(rnd, client, number):
+    method = 'find'
+    point = rnd.random()
+
+    for name, share in MIX:
+        if point < share:
+            method = name
+            break
+        point -= share
+
+    if method == 'add':
+        params = {'name': f'Client{client}_{number}', 'phones': [f'+380{rnd.randrange(10 ** 9):09d}'],
+                  'birthday': f'{rnd.randrange(1, 29):02d}.{rnd.randrange(1, 13):02d}.1990'}
+    elif method == 'add_note':
+        params = {'title': f'Note {client}_{number}', 'content': 'Benchmark note content',
+                  'tags': [f'tag{rnd.randrange(20)}']}
+    elif method == 'bday_in':
+        params = {'days': rnd.randrange(1, 30)}
+    elif method == 'search_notes':
+        params = {'keyword': f'{rnd.randrange(100)}'}
+    elif method == 'sort_by_tag':
+        params = {'tag': f'tag{rnd.randrange(20)}'}
+    else:
+        params = {'text': f'{rnd.randrange(1000):03d}'}
+
+    return {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': number}
+
+
+async def client(port, number, requests, latencies, errors):
+    rnd = random.Random(number)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=RESPONSE_LIMIT)
+
+    for i in range(requests):
+        start = time.perf_counter()
+        writer.write(json.dumps(make_call(rnd, number, i)).encode() + b'\n')
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+
+        if 'error' in response:
+            errors.append(response['error']['message'])
+
+    writer.close()
+
+
+async def preload(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=RESPONSE_LIMIT)
+
+    # pipelined, the writes of the preload go to disk in a few group commits
+    for i in range(PRELOAD):
+        writer.write(json.dumps({'jsonrpc': '2.0', 'method': 'add', 'id': i,
+                                 'params': {'name': f'Preload{i}', 'phones': [f'+380{i:09d}']}}).encode() + b'\n')
+        writer.write(json.dumps({'jsonrpc': '2.0', 'method': 'add_note', 'id': i,
+                                 'params': {'title': f'Preload note {i}', 'content': f'Content of note {i}',
+                                            'tags': [f'tag{i % 20}']}}).encode() + b'\n')
+
+    for _ in range(PRELOAD * 2):
+        await reader.readline()
+
+    writer.close()
+
+
+async def connect(port):
+    for _ in range(100):
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+
+    raise RuntimeError('server did not start')
+
+
+async def load(port, clients, requests):
+    await connect(port)
+    await preload(port)
+
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, number, requests, latencies, errors) for number in range(clients)))
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    percentile = lambda share: latencies[min(len(latencies) - 1, int(len(latencies) * share))] * 1000
+    print(f'{clients} clients x {requests} requests: {len(latencies) / seconds:.0f} req/s, '
+          f'p50 {percentile(0.5):.2f} ms, p99 {percentile(0.99):.2f} ms, errors {len(errors)}')
+
+
+def main(clients, requests):
+    folder = tempfile.mkdtemp()
+    port = free_port()
+    server = Process(target=run_server, args=(port, folder), daemon=True)
+    server.start()
+
+    try:
+        asyncio.run(load(port, clients, requests))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args) if args else main(16, 500)
@@ -0,0 +1,73 @@
+# Startup of jason.py: modules imported before the menu (from -X importtime) and the time from launch to the
+# first prompt of the menu and of each program, in a fresh interpreter every run.
+# Usage: python benchmarks/bench_startup.py [runs]
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (menu input, text of the prompt to wait for)
+PROMPTS = [('', 'Choose program:'),
+           ('1\n', 'Put your request here:'),
+           ('2\n', 'Enter a command:'),
+           ('3\n', 'Please select your folder')]
+
+
+# (cumulative microseconds, module) of everything 'import jason' imports, the slowest first
+def import_times():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import jason'], cwd=ROOT,
+                            capture_output=True, text=True)
+    times = []
+
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative_us), name.strip()))
+
+    return sorted(times, reverse=True)
+
+
+# Seconds from starting jason.py until the prompt shows up, reading the output as it comes
+def time_to_prompt(menu_input, prompt, folder):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'jason.py')], cwd=folder,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    process.stdin.write(menu_input.encode())
+    process.stdin.flush()
+
+    output = b''
+    while prompt.encode() not in output:
+        chunk = process.stdout.read1(65536)
+        if not chunk:
+            break
+        output += chunk
+
+    seconds = time.perf_counter() - start
+    process.kill()
+    process.wait()
+    return seconds
+
+
+def main(runs):
+    times = import_times()
+    total = {name: cumulative for cumulative, name in times}['jason']
+    print(f'import jason: {total / 1000:.1f} ms, slowest imports:')
+    for cumulative, name in [item for item in times if item[1] != 'jason'][:8]:
+        print(f'{cumulative / 1000:>10.1f} ms  {name}')
+
+    folder = tempfile.mkdtemp()
+    print(f'\n{"first prompt":<28} {"median ms":>10}')
+
+    for menu_input, prompt in PROMPTS:
+        seconds = statistics.median(time_to_prompt(menu_input, prompt, folder) for _ in range(runs))
+        print(f'{prompt:<28} {seconds * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,111 @@
+# Deterministic synthetic data for the benchmarks: contacts, notes and folders of files to sort.
+# The same (count, seed) always gives the same data, so timings of different commits are comparable.
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import zipfile
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from address_book import AddressBook, _record_from_row
+from file_sort import TRANS
+
+FIRST_NAMES = ['Olha', 'Dmytro', 'Іван', 'Анна', 'Petro', 'Марія', 'Oleksandr', 'Юлія', 'Taras', 'Наталія',
+               'Andrii', 'Оксана', 'Serhii', 'Ірина', 'Mykola', 'Катерина']
+LAST_NAMES = ['Petrenko', 'Шевченко', 'Kovalenko', 'Бондаренко', 'Tkachenko', 'Кравченко', 'Melnyk', 'Бойко',
+              'Moroz', 'Лисенко', 'Savchenko', 'Руденко']
+STREETS = ['Nezalozhnosti', 'Khreshchatyk', 'Sadova', 'Shevchenka', 'Franka', 'Lesi Ukrainky']
+TAGS = ['work', 'home', 'urgent', 'ideas', 'travel', 'books', 'music', 'health', 'money', 'family',
+        'todo', 'later', 'python', 'study', 'sport', 'shopping']
+WORDS = ['meeting', 'call', 'report', 'plan', 'buy', 'read', 'write', 'project', 'deadline', 'review', 'garden',
+         'ticket', 'doctor', 'budget', 'friend', 'birthday', 'lesson', 'code', 'release', 'weekend', 'кава',
+         'зустріч', 'подорож', 'книга', 'лист', 'план']
+
+# Files of the folders to sort: known extensions, ones file_sort does not know, and no extension at all
+EXTENSIONS = ['jpeg', 'jpg', 'png', 'svg', 'mp3', 'mp4', 'zip', 'txt', 'docx', 'pdf', '']
+FOLDER_NAMES = ['photos', 'фото', 'old', 'downloads', 'архів', 'misc']
+
+FIRST_BIRTHDAY = date(1950, 1, 1).toordinal()
+LAST_BIRTHDAY = date(2005, 12, 31).toordinal()
+
+
+# Rows in the snapshot layout (see address_book._record_to_row); names are unique, phones may repeat
+def contact_rows(count, seed=0):
+    rnd = random.Random(seed)
+
+    for i in range(count):
+        first = rnd.choice(FIRST_NAMES)
+        last = rnd.choice(LAST_NAMES)
+        phones = [f'+380{rnd.randrange(10 ** 9):09d}' for _ in range(1 + (rnd.random() < 0.3))]
+        birthday = rnd.randint(FIRST_BIRTHDAY, LAST_BIRTHDAY) if rnd.random() < 0.7 else 0
+        email = f'{first.translate(TRANS).lower()}.{last.translate(TRANS).lower()}{i}@mail.com'
+        address = f'{rnd.choice(STREETS)}, {rnd.randrange(1, 300)}'
+        yield f'{first}_{last}{i}', tuple(phones), birthday, email, address
+
+
+# Book filled with the generated contacts; with no file name it lives in a temporary folder
+def build_book(count, seed=0, filename=None) -> AddressBook:
+    if filename is None:
+        filename = os.path.join(tempfile.mkdtemp(), 'save.json')
+
+    book = AddressBook(filename)
+    book.add_records(_record_from_row(row) for row in contact_rows(count, seed))
+    return book
+
+
+# The contacts as the CSV import reads them; every 50th row has a broken phone
+def write_contacts_csv(filename, count, seed=0) -> None:
+    with open(filename, 'w', newline='') as writer:
+        csv_writer = csv.writer(writer)
+        csv_writer.writerow(['name', 'phones', 'email', 'address', 'birthday'])
+
+        for i, (name, phones, birthday, email, address) in enumerate(contact_rows(count, seed)):
+            phones = '12345' if i % 50 == 0 else ';'.join(phone[3:] for phone in phones)
+            birthday = date.fromordinal(birthday).isoformat() if birthday else ''
+            csv_writer.writerow([name, phones, email, address, birthday])
+
+
+# Notes in the notes.json layout with unique titles
+def note_dicts(count, seed=0):
+    rnd = random.Random(seed)
+
+    for i in range(count):
+        title = f'{rnd.choice(WORDS).capitalize()} {rnd.choice(WORDS)} {i}'
+        content = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(5, 60)))
+        tags = rnd.sample(TAGS, rnd.randint(0, 3))
+        yield {'title': title, 'content': content, 'tags': tags}
+
+
+def write_notes(filename, count, seed=0) -> None:
+    with open(filename, 'w') as writer:
+        json.dump(list(note_dicts(count, seed)), writer)
+
+
+# Folder tree with 'count' files to sort: nested folders, Cyrillic names and small zip archives
+def make_tree(root, count, seed=0) -> None:
+    rnd = random.Random(seed)
+    folders = [root]
+    os.makedirs(root, exist_ok=True)
+
+    for i in range(count):
+        # a new folder every ~50 files, inside one of the existing ones
+        if i % 50 == 49:
+            folder = os.path.join(rnd.choice(folders), f'{rnd.choice(FOLDER_NAMES)}{len(folders)}')
+            os.makedirs(folder, exist_ok=True)
+            folders.append(folder)
+
+        extension = rnd.choice(EXTENSIONS)
+        name = f'{rnd.choice(FIRST_NAMES)}_{rnd.choice(WORDS)}{i}' + (f'.{extension}' if extension else '')
+        path = os.path.join(rnd.choice(folders), name)
+
+        if extension == 'zip':
+            with zipfile.ZipFile(path, 'w') as archive:
+                archive.writestr(f'{rnd.choice(WORDS)}.txt', 'x' * rnd.randrange(100))
+        else:
+            with open(path, 'wb') as writer:
+                writer.write(b'x' * rnd.randrange(100))
+
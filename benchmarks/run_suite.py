@@ -0,0 +1,168 @@
+# Benchmark suite over generated data: address book load/save/find/bday, notebook load/search/sort/save and
+# sorting a folder of files, for each size. Results go to a JSON file; --compare prints the change against an
+# earlier result file, e.g. one saved on another commit.
+# Usage: python benchmarks/run_suite.py [--sizes 1000 100000] [--output results.json] [--compare old.json]
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from generators import build_book, contact_rows, make_tree, note_dicts, write_notes
+
+import file_parser
+import file_sort
+from address_book import AddressBook, _record_from_row, find, show_bday_in_days
+from note_book import Note, Notebook
+
+FIND_QUERIES = ['Petrenko12', 'enko9', '4520', 'Sadova, 17']
+NOTE_KEYWORDS = ['plan', 'кава', 'release 1', 'nothing like this']
+NOTE_TAGS = ['work', 'python']
+
+
+# Median seconds of 'repeat' calls, with the console output of the code under test thrown away
+def measure(func, repeat):
+    times = []
+
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+    return statistics.median(times)
+
+
+def bench_address_book(folder, size, repeat, report):
+    filename = os.path.join(folder, 'save.json')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        book = build_book(size, filename=filename)
+
+    # all the records are new and go to the journal, then it is folded into save.json
+    report('address_book.save_all', size, measure(book._save, 1))
+    report('address_book.compact', size, measure(book._compact, 1))
+
+    os.remove(book.cache_filename)
+    report('address_book.load_json', size, measure(lambda: AddressBook(filename), 1))
+    report('address_book.load_snapshot', size, measure(lambda: AddressBook(filename), repeat))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        book = AddressBook(filename)
+
+    extra_rows = contact_rows(repeat, seed=size + 1)
+
+    def save_one():
+        name, *rest = next(extra_rows)
+        book.add_record(_record_from_row((f'Extra_{name}', *rest)))
+        book._save()
+
+    report('address_book.save_one', size, measure(save_one, repeat))
+    report('address_book.find', size,
+           measure(lambda: [find(book, ['find', query]) for query in FIND_QUERIES], repeat) / len(FIND_QUERIES))
+    report('address_book.bday_in_7', size, measure(lambda: show_bday_in_days(book, ['bday in', '7']), repeat))
+
+
+def bench_notebook(folder, size, repeat, report):
+    filename = os.path.join(folder, 'notes.json')
+    write_notes(filename, size)
+
+    # the first load parses notes.json and writes the snapshot the later ones start from
+    report('notebook.load_json', size, measure(lambda: Notebook(filename), 1))
+    report('notebook.load', size, measure(lambda: Notebook(filename), repeat))
+    notebook = Notebook(filename)
+
+    report('notebook.search_notes', size,
+           measure(lambda: [notebook.search_notes(keyword) for keyword in NOTE_KEYWORDS], repeat) / len(NOTE_KEYWORDS))
+    report('notebook.sort_notes', size,
+           measure(lambda: [notebook.sort_notes(keyword) for keyword in NOTE_KEYWORDS], repeat) / len(NOTE_KEYWORDS))
+    report('notebook.sort_notes_by_tags', size,
+           measure(lambda: [notebook.sort_notes_by_tags(tag) for tag in NOTE_TAGS], repeat) / len(NOTE_TAGS))
+    report('notebook.save_notes', size, measure(notebook.save_notes, repeat))
+
+    def add_all():
+        empty = Notebook(os.path.join(folder, 'empty.json'))
+        for item in note_dicts(size):
+            empty.add_note(Note(item['title'], item['content'], item['tags']))
+
+    report('notebook.add_note_all', size, measure(add_all, 1))
+
+
+def bench_file_sort(folder, size, repeat, report):
+    root = Path(folder) / 'tree'
+    make_tree(root, size)
+
+    def scan():
+        # the parser collects into module lists, every run starts from empty ones
+        for found in (*file_parser.REGISTER_EXTENSION.values(), file_parser.MY_OTHER, file_parser.FOLDERS):
+            found.clear()
+        file_parser.EXTENSION.clear()
+        file_parser.UNKNOWN.clear()
+        file_parser.scan(root)
+
+    report('file_parser.scan', size, measure(scan, repeat))
+    # moving is done once, the files are not where they were afterwards
+    report('file_sort.sort_files', size, measure(lambda: file_sort.sort_files(root), 1))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, old_filename):
+    with open(old_filename) as reader:
+        old = {(item['benchmark'], item['size']): item['seconds'] for item in json.load(reader)['results']}
+
+    print(f'\n{"benchmark":<30} {"size":>8} {"old ms":>10} {"new ms":>10} {"change":>8}')
+    for item in results:
+        old_seconds = old.get((item['benchmark'], item['size']))
+        if old_seconds:
+            print(f'{item["benchmark"]:<30} {item["size"]:>8} {old_seconds * 1000:>10.3f} '
+                  f'{item["seconds"] * 1000:>10.3f} {item["seconds"] / old_seconds - 1:>+8.1%}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the address book, the notebook and the file sorter')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier result file to compare with')
+    args = parser.parse_args()
+
+    results = []
+
+    def report(benchmark, size, seconds):
+        results.append({'benchmark': benchmark, 'size': size, 'seconds': seconds})
+        print(f'{benchmark:<30} {size:>8} {seconds * 1000:>12.3f} ms')
+
+    for size in args.sizes:
+        for bench in (bench_address_book, bench_notebook, bench_file_sort):
+            folder = tempfile.mkdtemp()
+            try:
+                bench(folder, size, args.repeat, report)
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+
+    with open(args.output, 'w') as writer:
+        json.dump({'commit': git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                   'repeat': args.repeat, 'results': results}, writer, indent=4)
+
+    print(f'Results saved to {args.output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
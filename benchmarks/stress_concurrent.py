@@ -0,0 +1,82 @@
+# Stress test of concurrent sessions: N writer processes add and delete contacts and notes in the same
+# save.json and notes.json, saving many times, then a fresh load must see every surviving change.
+# Usage: python benchmarks/stress_concurrent.py [writers] [records per writer]
+from contextlib import redirect_stdout
+from multiprocessing import Process
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import address_book
+import note_book
+from address_book import AddressBook, Record, Name, Phone
+from note_book import Note, Notebook
+
+# Saves after this many changes; a small journal limit makes the sessions compact under each other
+SAVE_EVERY = 5
+
+
+def writer(folder, number, records):
+    address_book.JOURNAL_COMPACT_MIN = 20
+    note_book.JOURNAL_COMPACT_MIN = 20
+
+    with redirect_stdout(io.StringIO()):
+        book = AddressBook(os.path.join(folder, 'save.json'))
+        notebook = Notebook(os.path.join(folder, 'notes.json'))
+
+        for i in range(records):
+            book.add_record(Record(Name(f'Writer{number}_{i}'), Phone(f'+380{number:04d}{i:05d}')))
+            notebook.add_note(Note(f'Note{number}_{i}', 'Some content', [f'w{number}']))
+
+            # every third change is taken back, deletes have to survive the merges too
+            if i % 3 == 2:
+                book.delete_record(f'Writer{number}_{i - 1}')
+                notebook.delete_note(f'Note{number}_{i - 1}')
+
+            if i % SAVE_EVERY == SAVE_EVERY - 1:
+                book._save()
+                notebook.save_notes()
+
+        book._save()
+        notebook.save_notes()
+
+
+def expected_names(writers, records, prefix):
+    return {f'{prefix}{number}_{i}' for number in range(writers) for i in range(records)
+            if i % 3 != 1 or i == records - 1}
+
+
+def main(writers, records):
+    folder = tempfile.mkdtemp()
+    start = time.perf_counter()
+    processes = [Process(target=writer, args=(folder, number, records)) for number in range(writers)]
+
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    seconds = time.perf_counter() - start
+
+    with redirect_stdout(io.StringIO()):
+        names = set(AddressBook(os.path.join(folder, 'save.json')).data)
+        titles = {note.title for note in Notebook(os.path.join(folder, 'notes.json')).notes}
+
+    lost = 0
+    for kind, found, expected in (('contacts', names, expected_names(writers, records, 'Writer')),
+                                  ('notes', titles, expected_names(writers, records, 'Note'))):
+        print(f'{kind:>8}: {len(found)} of {len(expected)}, lost {len(expected - found)}, '
+              f'stale {len(found - expected)}')
+        lost += len(expected ^ found)
+
+    print(f'{writers} writers x {records} records in {seconds:.2f} s')
+    return 1 if lost or any(process.exitcode for process in processes) else 0
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(main(*args) if args else main(8, 200))
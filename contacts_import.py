@@ -0,0 +1,220 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+import csv
+import os
+import time
+
+from address_book import Email, Phone, _record_from_row
+
+# Rows validated by one worker task
+CHUNK_SIZE = 5000
+
+# Characters people put into phone numbers that the address book does not keep
+PHONE_FILLERS = str.maketrans('', '', ' -()')
+
+BIRTHDAY_FORMATS = ('%d %B %Y', '%Y-%m-%d', '%Y%m%d', '%d.%m.%Y')
+
+
+"""Class ImportResult підсумовує імпорт: скільки рядків прочитано та додано, помилки по рядках, пропущені дублікати
+імен і швидкість."""
+class ImportResult:
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.errors = []  # (row number, message)
+        self.duplicates = []  # (row number, name) of the rows whose name is already in the book or in an earlier row
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# (row number, raw contact) for every contact of the file, read lazily
+def read_contacts(filename):
+    if filename.lower().endswith(('.vcf', '.vcard')):
+        return _read_vcard(filename)
+
+    return _read_csv(filename)
+
+
+# CSV with a header: name, phones (separated by ';'), email, address, birthday
+def _read_csv(filename):
+    with open(filename, newline='', encoding='utf-8-sig') as reader:
+        for number, row in enumerate(csv.DictReader(reader), 2):
+            yield number, {'name': row.get('name') or '',
+                           'phones': (row.get('phones') or row.get('phone') or '').split(';'),
+                           'email': row.get('email') or '',
+                           'address': row.get('address') or '',
+                           'birthday': row.get('birthday') or ''}
+
+
+# vCard 3/4: FN, TEL, EMAIL, ADR and BDAY properties; the row number is the line of BEGIN:VCARD
+def _read_vcard(filename):
+    contact = None
+
+    with open(filename, encoding='utf-8-sig') as reader:
+        for line_number, line in _unfolded_lines(reader):
+            prop, _, value = line.partition(':')
+            # 'item1.TEL' is TEL of the group item1, the groups only tie properties together
+            prop = prop.split(';')[0].rpartition('.')[2].upper()
+
+            if prop == 'BEGIN':
+                contact = {'name': '', 'phones': [], 'email': '', 'address': '', 'birthday': ''}
+                number = line_number
+            elif contact is None:
+                continue
+            elif prop == 'END':
+                yield number, contact
+                contact = None
+            elif prop == 'FN':
+                contact['name'] = value
+            elif prop == 'TEL':
+                contact['phones'].append(value.removeprefix('tel:'))
+            elif prop == 'EMAIL' and not contact['email']:
+                contact['email'] = value
+            elif prop == 'ADR' and not contact['address']:
+                contact['address'] = ', '.join(part for part in value.split(';') if part)
+            elif prop == 'BDAY':
+                contact['birthday'] = value
+
+
+# (line number, line) of the vCard with the folded lines joined back: a line that starts with a space or a tab
+# continues the previous one (RFC 6350, 3.2)
+def _unfolded_lines(reader):
+    number, line = 0, None
+
+    for line_number, text in enumerate(reader, 1):
+        text = text.rstrip('\r\n')
+
+        if text[:1] in (' ', '\t') and line is not None:
+            line += text[1:]
+            continue
+
+        if line is not None:
+            yield number, line
+        number, line = line_number, text
+
+    if line is not None:
+        yield number, line
+
+
+# Snapshot row of the contact (see address_book._record_to_row); raises ValueError with the reason
+def validate_contact(contact) -> tuple:
+    name = contact['name'].strip()
+    if not name:
+        raise ValueError('name is empty')
+
+    phones = []
+    for raw_phone in contact['phones']:
+        raw_phone = raw_phone.translate(PHONE_FILLERS)
+        if not raw_phone:
+            continue
+
+        phone = Phone.normalize_phone(raw_phone) if Phone.valid_phone(raw_phone) else None
+        if phone is None:
+            raise ValueError(f'wrong phone number {raw_phone}')
+        if phone not in phones:
+            phones.append(phone)
+
+    if not phones:
+        raise ValueError('no phone number')
+
+    email = contact['email'].strip()
+    if email and not Email.valid_email(email):
+        raise ValueError(f'wrong email {email}')
+
+    birthday = 0
+    if contact['birthday'].strip():
+        birthday = _parse_birthday(contact['birthday'].strip())
+
+    return name, tuple(phones), birthday, email, contact['address'].strip()
+
+
+def _parse_birthday(value) -> int:
+    for date_format in BIRTHDAY_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().toordinal()
+        except ValueError:
+            continue
+
+    raise ValueError(f'wrong birthday {value}')
+
+
+# Runs in the worker processes: ((row number, valid row) pairs, errors) of one chunk
+def validate_chunk(chunk) -> tuple:
+    rows = []
+    errors = []
+
+    for number, contact in chunk:
+        try:
+            rows.append((number, validate_contact(contact)))
+        except ValueError as error:
+            errors.append((number, str(error)))
+
+    return rows, errors
+
+
+def _chunks(contacts):
+    while True:
+        chunk = list(islice(contacts, CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+# Reads the file chunk by chunk, validates chunks in worker processes and adds the valid contacts in one batch;
+# a contact whose name is already taken is skipped, the existing one is kept
+def import_contacts(adr_book, filename, workers=None) -> ImportResult:
+    result = ImportResult()
+    start = time.perf_counter()
+    rows = []
+    names = set()
+
+    # chunks come in the file order, so the first row with a name wins
+    def collect(chunk_rows, chunk_errors, chunk_size):
+        result.rows += chunk_size
+        result.errors.extend(chunk_errors)
+
+        for number, row in chunk_rows:
+            if row[0] in names or row[0] in adr_book.data:
+                result.duplicates.append((number, row[0]))
+            else:
+                names.add(row[0])
+                rows.append(row)
+
+    chunks = _chunks(read_contacts(filename))
+    first_chunk = next(chunks, [])
+
+    # one chunk is validated right here, the pool would only add its start-up time
+    if len(first_chunk) < CHUNK_SIZE or workers == 1:
+        for chunk in _prepend(first_chunk, chunks):
+            collect(*validate_chunk(chunk), len(chunk))
+    else:
+        workers = workers or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(workers) as pool:
+            pending = []
+
+            for chunk in _prepend(first_chunk, chunks):
+                pending.append((pool.submit(validate_chunk, chunk), len(chunk)))
+
+                # keep a bounded number of chunks in flight, so big files are not read into memory at once
+                if len(pending) >= workers * 2:
+                    future, size = pending.pop(0)
+                    collect(*future.result(), size)
+
+            for future, size in pending:
+                collect(*future.result(), size)
+
+    adr_book.add_records(_record_from_row(row) for row in rows)
+    result.imported = len(rows)
+    result.seconds = time.perf_counter() - start
+    return result
@@ -52,6 +52,30 @@ def handle_folder(folder: Path):
         print(f"Can't delete folder: {folder}")
 
 
+# Moves the files found by parser.scan into the folders by type and removes the emptied folders
+def sort_files(folder: Path) -> None:
+    for file in parser.JPEG_IMAGES:
+        handle_media(file, folder / 'images' / 'JPEG')
+    for file in parser.JPG_IMAGES:
+        handle_media(file, folder / 'images' / 'JPG')
+    for file in parser.PNG_IMAGES:
+        handle_media(file, folder / 'images' / 'PNG')
+    for file in parser.SVG_IMAGES:
+        handle_media(file, folder / 'images' / 'SVG')
+    for file in parser.MP3_AUDIO:
+        handle_media(file, folder / 'audio')
+    for file in parser.MP4_VIDEO:
+        handle_media(file, folder / 'video')
+
+    for file in parser.MY_OTHER:
+        handle_media(file, folder / 'MY_OTHER')
+    for file in parser.ARCHIVES:
+        handle_archive(file, folder / 'ARCHIVES')
+
+    for folder in parser.FOLDERS[::-1]:
+        handle_folder(folder)
+
+
 def main():
     while True:
         input_line = input(
@@ -60,26 +84,7 @@ def main():
             break
         folder = Path(input_line)
         parser.scan(folder)
-        for file in parser.JPEG_IMAGES:
-            handle_media(file, folder / 'images' / 'JPEG')
-        for file in parser.JPG_IMAGES:
-            handle_media(file, folder / 'images' / 'JPG')
-        for file in parser.PNG_IMAGES:
-            handle_media(file, folder / 'images' / 'PNG')
-        for file in parser.SVG_IMAGES:
-            handle_media(file, folder / 'images' / 'SVG')
-        for file in parser.MP3_AUDIO:
-            handle_media(file, folder / 'audio')
-        for file in parser.MP4_VIDEO:
-            handle_media(file, folder / 'video')
-
-        for file in parser.MY_OTHER:
-            handle_media(file, folder / 'MY_OTHER')
-        for file in parser.ARCHIVES:
-            handle_archive(file, folder / 'ARCHIVES')
-
-        for folder in parser.FOLDERS[::-1]:
-            handle_folder(folder)
+        sort_files(folder)
         print('The folder has been succesfully sorted')
 
 
@@ -0,0 +1,87 @@
+from file_sort import TRANS
+
+
+# Latin, casefolded form of the name, so "Дмитро" and "dmitro" are the same key
+def fuzzy_key(text: str) -> str:
+    return text.translate(TRANS).casefold()
+
+
+def levenshtein(first: str, second: str) -> int:
+    if len(first) < len(second):
+        first, second = second, first
+
+    previous = list(range(len(second) + 1))
+
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (first_char != second_char)))
+        previous = current
+
+    return previous[-1]
+
+
+"""Class BKTree зберігає ключі у дереві Буркхарда-Келлера: нащадки вузла згруповані за відстанню Левенштейна до
+нього, тому пошук у радіусі обходить лише гілки, що можуть містити близькі ключі. Кожен ключ має множину імен записів."""
+class BKTree:
+
+    def __init__(self):
+        self.root = None  # [key, names, {distance: child node}]
+        self.size = 0
+
+    def add(self, key, name):
+        if self.root is None:
+            self.root = [key, {name}, {}]
+            self.size += 1
+            return
+
+        node = self.root
+        while True:
+            distance = levenshtein(key, node[0])
+
+            if distance == 0:
+                node[1].add(name)
+                return
+
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, {name}, {}]
+                self.size += 1
+                return
+
+            node = child
+
+    # the node stays in the tree even without names, it still routes the search to its children
+    def discard(self, key, name):
+        node = self.root
+
+        while node is not None:
+            distance = levenshtein(key, node[0])
+
+            if distance == 0:
+                node[1].discard(name)
+                return
+
+            node = node[2].get(distance)
+
+    # (distance, key, names) of the keys within max_distance, the closest first
+    def search(self, key, max_distance) -> list:
+        found = []
+        nodes = [self.root] if self.root is not None else []
+
+        while nodes:
+            node = nodes.pop()
+            distance = levenshtein(key, node[0])
+
+            if distance <= max_distance and node[1]:
+                found.append((distance, node[0], node[1]))
+
+            # triangle inequality: only children at distance-max..distance+max can hold close keys
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    nodes.append(child)
+
+        found.sort(key=lambda item: (item[0], item[1]))
+        return found
@@ -0,0 +1,256 @@
+# JSON-RPC 2.0 server over the address book and the notebook: one request or response per line,
+# on localhost TCP or on a Unix socket. The data stays in memory between the calls, writes are
+# saved in groups: every write waits for the next commit, which saves all the writes made meanwhile.
+# Usage: python jason_server.py [port | unix socket path]
+from contextlib import redirect_stdout
+import asyncio
+import io
+import json
+import os
+import sys
+
+from address_book import open_address_book, _record_from_row, _record_to_dict
+from contacts_import import validate_contact
+from note_book import InvalidFormatError, Note, open_notebook
+
+DEFAULT_PORT = 8765
+
+# Seconds a commit waits for more writes to join it
+COMMIT_DELAY = 0.005
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+"""Class RpcError - помилка виклику, яку сервер повертає клієнту з кодом JSON-RPC."""
+class RpcError(Exception):
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+"""Class JasonServer тримає адресну книгу та блокнот у пам'яті й відповідає на виклики клієнтів. Зміни зберігає
+групами: запис чекає на найближчий commit, і один commit зберігає всі зміни, зроблені за COMMIT_DELAY."""
+class JasonServer:
+
+    def __init__(self, adr_book, notebook, commit_delay=COMMIT_DELAY):
+        self.adr_book = adr_book
+        self.notebook = notebook
+        self.commit_delay = commit_delay
+        self.is_notebook_changed = False
+        self._commit = None  # future of the next commit, None if no write waits for one
+        # held by the calls that use the book or the notebook and by a commit while it saves them in another thread:
+        # they are not thread-safe, and a save may merge the changes of other sessions into them
+        self._storage = asyncio.Lock()
+        self._saves = set()  # running commit tasks, kept so they are not garbage collected
+        self.methods = {'add': self.add,
+                        'find': self.find,
+                        'bday_in': self.bday_in,
+                        'add_note': self.add_note,
+                        'search_notes': self.search_notes,
+                        'sort_by_tag': self.sort_by_tag}
+
+    async def add(self, name, phones, email='', address='', birthday=''):
+        if isinstance(phones, str):
+            phones = [phones]
+
+        try:
+            row = validate_contact({'name': name, 'phones': phones, 'email': email, 'address': address,
+                                    'birthday': birthday})
+        except ValueError as error:
+            raise RpcError(INVALID_PARAMS, str(error))
+
+        record = _record_from_row(row)
+        async with self._storage:
+            self.adr_book.add_record(record)
+            result = _record_to_dict(record)
+
+        await self._committed()
+        return result
+
+    async def find(self, text):
+        async with self._storage:
+            return [_record_to_dict(record) for record in self.adr_book.search(str(text))]
+
+    async def bday_in(self, days):
+        if not isinstance(days, int) or days < 0:
+            raise RpcError(INVALID_PARAMS, 'days should be a non-negative number')
+
+        async with self._storage:
+            return [{'days': days_left, 'record': _record_to_dict(record)}
+                    for days_left, record in self.adr_book.birthdays_within(days)]
+
+    async def add_note(self, title, content, tags=()):
+        if not isinstance(title, str) or not isinstance(content, str):
+            raise RpcError(INVALID_PARAMS, 'title and content should be strings')
+        if not isinstance(tags, (list, tuple)) or not all(isinstance(tag, str) for tag in tags):
+            raise RpcError(INVALID_PARAMS, 'tags should be a list of strings')
+        if len(title) < 5:
+            raise RpcError(INVALID_PARAMS, 'Invalid format. Title length should be >= 5.')
+        if len(content) < 10:
+            raise RpcError(INVALID_PARAMS, 'Invalid format. Content length should be >= 10.')
+
+        async with self._storage:
+            if self.notebook.find_note(title) is not None:
+                raise RpcError(INVALID_PARAMS, 'Note with the same title already exists.')
+
+            note = Note(title, content, list(tags))
+
+            try:
+                # the notebook reports to the console, the server has none
+                with redirect_stdout(io.StringIO()):
+                    self.notebook.add_note(note)
+            except InvalidFormatError as error:
+                raise RpcError(INVALID_PARAMS, str(error))
+
+            self.is_notebook_changed = True
+            result = _note_to_dict(note)
+
+        await self._committed()
+        return result
+
+    async def search_notes(self, keyword):
+        async with self._storage:
+            return [_note_to_dict(note) for note in self.notebook.search_notes(keyword)]
+
+    async def sort_by_tag(self, tag):
+        async with self._storage:
+            return [_note_to_dict(note) for note in self.notebook.sort_notes_by_tags(tag)]
+
+    # Waits until the changes made so far are on disk, together with the writes of other clients
+    async def _committed(self):
+        if self._commit is None:
+            loop = asyncio.get_running_loop()
+            self._commit = loop.create_future()
+            loop.call_later(self.commit_delay, self._start_save)
+
+        await asyncio.shield(self._commit)
+
+    def _start_save(self):
+        task = asyncio.create_task(self._save())
+        self._saves.add(task)
+        task.add_done_callback(self._saves.discard)
+
+    # The file lock, fsync and compaction run in a worker thread instead of the event loop: connections keep being
+    # read and answered, the calls that use the book or the notebook wait for the save and their writes go to the next
+    # commit. The storage lock also keeps two commits from overlapping.
+    async def _save(self):
+        async with self._storage:
+            commit, self._commit = self._commit, None
+
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._save_files)
+            except Exception as error:
+                commit.set_exception(error)
+            else:
+                commit.set_result(None)
+
+    def _save_files(self):
+        self.adr_book._save()
+        if self.is_notebook_changed:
+            self.notebook.save_notes()
+            self.is_notebook_changed = False
+
+    # Response dict for one request line, None for a notification (a request without id)
+    async def call(self, line):
+        request = {'id': None}
+
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RpcError(PARSE_ERROR, 'Parse error')
+
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                request = {'id': None}
+                raise RpcError(INVALID_REQUEST, 'Invalid Request')
+
+            method = self.methods.get(request['method'])
+            if method is None:
+                raise RpcError(METHOD_NOT_FOUND, f'Method not found: {request["method"]}')
+
+            params = request.get('params', {})
+
+            try:
+                if isinstance(params, dict):
+                    result = await method(**params)
+                else:
+                    result = await method(*params)
+            except TypeError as error:
+                raise RpcError(INVALID_PARAMS, str(error))
+
+            response = {'jsonrpc': '2.0', 'result': result}
+
+        except RpcError as error:
+            response = {'jsonrpc': '2.0', 'error': {'code': error.code, 'message': str(error)}}
+        except Exception as error:
+            response = {'jsonrpc': '2.0', 'error': {'code': INTERNAL_ERROR, 'message': repr(error)}}
+
+        if 'id' not in request:
+            return None
+
+        response['id'] = request['id']
+        return response
+
+    # Requests of one connection are served concurrently, so a write waiting for its commit does not hold the reads
+    async def serve_client(self, reader, writer):
+        tasks = set()
+
+        async def respond(line):
+            response = await self.call(line)
+            if response is not None:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _note_to_dict(note) -> dict:
+    return {'title': note.title, 'content': note.content, 'tags': note.tags}
+
+
+async def serve(address=DEFAULT_PORT, book_filename='save.json', notes_filename='notes.json'):
+    server = JasonServer(open_address_book(book_filename), open_notebook(notes_filename))
+
+    if isinstance(address, int):
+        listener = await asyncio.start_server(server.serve_client, '127.0.0.1', address)
+    else:
+        listener = await asyncio.start_unix_server(server.serve_client, address)
+
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    address = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PORT
+    if isinstance(address, str) and address.isdigit():
+        address = int(address)
+
+    print(f'Serving JSON-RPC on {address}')
+
+    try:
+        asyncio.run(serve(address, os.environ.get('JASON_ADDRESS_BOOK', 'save.json'),
+                          os.environ.get('JASON_NOTEBOOK', 'notes.json')))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,26 @@
 import json
+import mmap
 import os
-from prompt_toolkit import prompt
-from prompt_toolkit.completion import WordCompleter
+import pickle
+import sys
+import threading
 from abc import ABC, abstractmethod
 
+from persistence import (FileLock, append_json_lines, atomic_write, file_fingerprint, file_size, gc_paused,
+                         is_same_file, read_json_lines, remove_file)
+from stats import STATS
+
+# Журнал змін складається назад у notes.json, коли в ньому більше записів, ніж це число та ніж нотаток у блокноті
+JOURNAL_COMPACT_MIN = 100
+
+# Змінюється разом зі схемою заголовка у notes.json.cache
+CACHE_VERSION = 1
+
 class Note: #Клас Note представляє окрему нотатку з такими атрибутами:
             #title: Рядок, що представляє заголовок нотатки.
             #content: Рядок, що містить вміст нотатки.
             #tags: Список рядків, які представляють теги, пов'язані з нотаткою.
+    __slots__ = ('title', 'tags', '_content', '_content_span')
   
     def __init__(self, title, content, tags=[]):
 
@@ -15,6 +28,20 @@ class Note: #Клас Note представляє окрему нотатку з
         self.content = content
         self.tags = tags if tags is not None else []
 
+    @property
+    def content(self): # Вміст нотатки зі знімка notes.json.cache декодується з mmap лише під час першого звернення.
+        if self._content_span is not None:
+            content_map, start, end = self._content_span
+            self._content = content_map[start:end].decode()
+            self._content_span = None
+
+        return self._content
+
+    @content.setter
+    def content(self, content):
+        self._content = content
+        self._content_span = None
+
     def __str__(self):
         return f"Title: {self.title}\nContent: {self.content}\nTags: {', '.join(self.tags)}"
 
@@ -23,20 +50,45 @@ class InvalidFormatError(Exception): # Клас InvalidFormatError є власн
 
 
 class Notebook: # Клас Notebook представляє собою колекцію нотаток і надає методи для їх управління. Він має наступні атрибути:
-                # notes: Список об'єктів Note.
+                # notes: Список об'єктів Note у порядку додавання.
                 # filename: Назва файлу, який використовується для зберігання нотаток у форматі JSON.
+                # journal_filename: <filename>.journal, змінені та видалені нотатки, ще не складені в notes.json.
+                # cache_filename: <filename>.cache, двійковий знімок notes.json для швидкого запуску.
 
     def __init__(self, filename="notes.json"):
 
-        self.notes = []
+        self._notes = {}  # заголовок (casefold) -> Note, у порядку додавання; з нього ж береться список notes
         self.filename = filename
-
-        if not os.path.exists(self.filename):
-            with open(self.filename, 'w') as file:
-                json.dump([], file)
-        else:
-            self.load_notes()
-
+        self.journal_filename = f'{filename}.journal'
+        self.cache_filename = f'{filename}.cache'
+        # заголовки (casefold) змінених або видалених після останнього збереження нотаток, у порядку додавання нових ->
+        # True, якщо нотатку видалили й додали знову і тепер вона в кінці блокнота
+        self._dirty = {}
+        self._journal_size = 0  # записів у файлі журналу
+        self._journal_offset = 0  # байтів журналу, які ця сесія вже застосувала
+        self._version = 0  # штамп версії файлу з lock-файлу, який бачила ця сесія
+        self._fingerprint = None  # (розмір, mtime, sha1) notes.json, з якого складено нотатки сесії
+        self._save_lock = threading.Lock()  # збереження цієї сесії та фонове складання журналу йдуть по черзі
+        self._compactor = None  # потік, що складає журнал у notes.json
+        self._index = None  # NotesIndex для search/sort, будується під час першого пошуку
+        self._tags = {}  # тег (casefold) -> {заголовок (casefold): None}, нотатки з тегом у порядку додавання
+
+        self.load_notes()
+
+    @property
+    def notes(self): # Список нотаток у порядку додавання.
+        return list(self._notes.values())
+
+    @notes.setter
+    def notes(self, notes): # Нотатки з однаковим заголовком (без урахування регістру) не повторюються, лишається перша.
+        self._notes = {}
+        self._index = None
+        self._tags = {}
+        for note in notes:
+            title = note.title.casefold()
+            if title not in self._notes:
+                self._notes[title] = note
+                self._index_tags(title, note.tags)
 
     def add_note(self, note): # Додає нову нотатку до блокнота. Перевіряє наявність нотаток з однаковими заголовками і валідує довжину тегів.
 
@@ -45,30 +97,64 @@ class Notebook: # Клас Notebook представляє собою колек
         
             # Перевірка на однакові назви
             title = note.title.casefold()
-            for existing_note in self.notes:
-                if existing_note.title.casefold() == title:
-                    print("Note with the same title already exists.")
-                    return
-            
-            self.notes.append(note)
+            if title in self._notes:
+                print("Note with the same title already exists.")
+                return
+
+            # теги, що відрізняються лише регістром, лишаються одним тегом, як і в add_tags
+            note.tags[:] = _unique_tags(note.tags)
+            self._set_note(title, note)
+            # нова нотатка в кінці блокнота, тож і в журнал іде після решти змінених
+            self._dirty[title] = self._dirty.pop(title, None) is not None
             print("Note added!")
 
 
     def search_notes(self, keyword): # Шукає нотатки, які містять вказане ключове слово в їхніх заголовках, вмісті або тегах.
-        """Пошук нотаток за ключовим словом."""
-        keyword = keyword.lower()
-        matching_notes = []
-        for note in self.notes:
-            if keyword in note.title.lower() or keyword in note.content.lower() or keyword in note.tags:
-                matching_notes.append(note)
-        return matching_notes
+        """Пошук нотаток за ключовим словом, найрелевантніші (BM25) першими."""
+        return self._text_index().search(keyword)
+
+    def sort_notes(self, keyword): # Усі нотатки: спершу з ключовим словом у тегах (3), заголовку (2), вмісті (1), потім решта.
+        return self._text_index().sort(keyword)
+
+    def _text_index(self):
+        if self._index is None:
+            from notes_index import NotesIndex
+
+            self._index = NotesIndex()
+            for title, note in self._notes.items():
+                self._index.add(title, note)
+
+        return self._index
+
+    def add_tags(self, note, tags): # Додає теги до нотатки блокнота, крім тих, що в неї вже є (без урахування регістру).
+        tags = [tag for tag in _unique_tags(tags) if not self.has_tag(note, tag)]
+        note.tags.extend(tags)
+        self._index_tags(note.title.casefold(), tags)
+        self._reindex(note)
+        self._dirty.setdefault(note.title.casefold(), False)
+
+    def has_tag(self, note, tag): # Чи є в нотатки тег, без урахування регістру.
+        return note.title.casefold() in self._tags.get(tag.casefold(), ())
+
+    def _index_tags(self, title, tags):
+        for tag in tags:
+            self._tags.setdefault(tag.casefold(), {})[title] = None
+
+    def _unindex_tags(self, title, tags):
+        for tag in tags:
+            tag = tag.casefold()
+            titles = self._tags.get(tag)
+            if titles is not None:
+                titles.pop(title, None)
+                if not titles:
+                    del self._tags[tag]
+
+    def _reindex(self, note):
+        if self._index is not None:
+            self._index.add(note.title.casefold(), note)
 
     def find_note(self, title): # Знаходить нотатку за її заголовком.
-        title = title.casefold()
-        for note in self.notes:
-            if note.title.casefold() == title:
-                return note
-        return None
+        return self._notes.get(title.casefold())
 
     def edit_note(self, title): # Редагує вміст існуючої нотатки.
         note = self.find_note(title)
@@ -87,41 +173,340 @@ class Notebook: # Клас Notebook представляє собою колек
             print(error)
         else:
             note.content = new_content
+            self._reindex(note)
+            self._dirty.setdefault(note.title.casefold(), False)
             return True
     
     def delete_note(self, title): #  Видаляє нотатку за заголовком.
         title = title.casefold()
-        for note in self.notes.copy():
-            if note.title.casefold() == title.casefold():
-                self.notes.remove(note)
-                return True
-        return False
+        if not self._drop_note(title):
+            return False
+
+        self._dirty.setdefault(title, False)
+        return True
+
+    # Ставить нотатку під заголовок (замість наявної, на її місце) разом з індексами, не позначаючи як змінену
+    def _set_note(self, title, note):
+        old_note = self._notes.get(title)
+        if old_note is not None:
+            self._unindex_tags(title, old_note.tags)
+
+        self._notes[title] = note
+        self._index_tags(title, note.tags)
+        if self._index is not None:
+            self._index.add(title, note)
+
+    def _drop_note(self, title):
+        note = self._notes.pop(title, None)
+        if note is None:
+            return False
+
+        self._unindex_tags(title, note.tags)
+        if self._index is not None:
+            self._index.remove(title)
+        return True
     
     def sort_notes_by_tags(self, tag): # Сортує нотатки за тегами,розміщуючи нотатки з вказаними тегами спереду.
+        return self.notes_with_tags([tag])
+
+    def notes_with_tags(self, tags, match_all=True): # Нотатки з усіма (або, з match_all=False, хоча б одним) тегами, за заголовком.
+        title_sets = [self._tags.get(tag.casefold(), {}) for tag in tags]
+        if not title_sets:
+            return []
+
+        if match_all:
+            # перетин обходить найменшу множину і перевіряє решту
+            smallest = min(title_sets, key=len)
+            titles = [title for title in smallest if all(title in others for others in title_sets)]
+        else:
+            titles = dict.fromkeys(title for titles in title_sets for title in titles)
+
+        return sorted((self._notes[title] for title in titles), key=lambda x: x.title.lower())
+
+    def tag_counts(self): # (тег, кількість нотаток) для всіх тегів, найчастіші першими.
+        return sorted(((tag, len(titles)) for tag, titles in self._tags.items()), key=lambda item: (-item[1], item[0]))
+
+    def related_tags(self, tag): # (тег, у скількох нотатках він разом із заданим), найчастіші першими.
         tag = tag.casefold()
-        filtered_notes = [note for note in self.notes if tag in [t.casefold() for t in note.tags]]
-        sorted_notes = sorted(filtered_notes, key=lambda x: x.title.lower())
-        return sorted_notes
+        counts = {}
+
+        for title in self._tags.get(tag, ()):
+            for other in {t.casefold() for t in self._notes[title].tags} - {tag}:
+                counts[other] = counts.get(other, 0) + 1
+
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
 
 
     def list_notes(self): # Перелічує всі нотатки у блокноті.
-        if not self.notes:
+        if not self._notes:
             print("No notes available.")
         else:
-            for i, note in enumerate(self.notes, start=1):
+            for i, note in enumerate(self._notes.values(), start=1):
                 print(f"{i}. Title: {note.title}")
                 print(f"   Content: {note.content}")
                 print(f"   Tags: {', '.join(note.tags)}")
 
-    def save_notes(self): # Зберігає нотатки у JSON-файлі.
-        data = [{'title': note.title, 'content': note.content, 'tags': note.tags} for note in self.notes]
-        with open(self.filename, 'w') as file:
-            json.dump(data, file)
+    # Дописує змінені та видалені нотатки в журнал; notes.json переписується лише під час складання журналу,
+    # у фоновому потоці. Якщо файл тим часом зберегла інша сесія, спершу зливає її зміни; при конфлікті за ту саму
+    # нотатку лишається зміна цієї сесії як пізніша.
+    def save_notes(self): # Зберігає зміни нотаток.
+        with self._save_lock, FileLock(self.filename) as lock, STATS.storage_timer('notebook', 'save'):
+            stamp = lock.read_stamp()
+
+            if stamp.get('version', 0) != self._version or self._is_file_changed():
+                self._merge_saved(stamp)
+
+            entries = []
+
+            # нові нотатки - у порядку додавання; видалена й додана знову спершу видаляється, бо сам запис put лишив би
+            # її на старому місці
+            for title, is_moved in self._dirty.items():
+                note = self._notes.get(title)
+                if note is None or is_moved:
+                    entries.append({'op': 'delete', 'title': title})
+                if note is not None:
+                    entries.append({'op': 'put', 'note': _note_to_dict(note)})
+
+            self._journal_size += append_json_lines(self.journal_filename, entries)
+            self._dirty.clear()
+            stamp['version'] = self._version = stamp.get('version', 0) + 1
+            self._journal_offset = file_size(self.journal_filename)
+            lock.write_stamp(stamp)
+
+            is_compaction_due = self._journal_size > max(JOURNAL_COMPACT_MIN, len(self._notes))
+
+        if is_compaction_due and (self._compactor is None or not self._compactor.is_alive()):
+            # не daemon: програма перед виходом дочекається складання
+            self._compactor = threading.Thread(target=self._compact, name='notes-compaction')
+            self._compactor.start()
+
+    def load_notes(self): # Завантажує нотатки з JSON-файлу та його журналу, скасовуючи незбережені зміни.
+        # без незбережених змін повторне завантаження - це лише злиття того, що змінилося у файлі
+        if self._fingerprint is not None and not self._dirty:
+            self.refresh_notes()
+            return
+
+        with self._save_lock, FileLock(self.filename) as lock, gc_paused(), STATS.storage_timer('notebook', 'load'):
+            self.notes = self._read_notes()
+            self._dirty.clear()
+            self._journal_size = 0
+            self._apply_journal(read_json_lines(self.journal_filename))
+            self._journal_offset = file_size(self.journal_filename)
+            self._version = lock.read_stamp().get('version', 0)
+
+    def refresh_notes(self): # Підхоплює зміни файлу, зроблені поза сесією, і повертає True, якщо вони були.
+        if not self._is_file_changed():
+            return False
+
+        with self._save_lock, FileLock(self.filename) as lock, STATS.storage_timer('notebook', 'refresh'):
+            # поки сесія чекала на блокування, файл могло скласти її ж фонове складання журналу, і це не зміна ззовні
+            if not self._is_file_changed():
+                return False
+
+            # файл зараз переписують (немає, недописаний чи з помилкою): нотатки сесії лишаються як є,
+            # а злиття повториться під час наступної перевірки
+            if not os.path.exists(self.filename):
+                return False
+
+            stamp = lock.read_stamp()
+
+            try:
+                self._merge_saved(stamp)
+            except (ValueError, KeyError, TypeError):
+                return False
+
+            self._version = stamp.get('version', 0)
+            self._journal_offset = file_size(self.journal_filename)
+
+            # вміст той самий або щойно прочитаний, тож новий mtime не змусить наступну перевірку рахувати хеш
+            size, _, sha1 = self._fingerprint
+            self._fingerprint = size, os.stat(self.filename).st_mtime_ns, sha1
+
+        return True
+
+    # Чи змінилися notes.json або журнал після того, як сесія їх прочитала: лише stat, без блокування та читання файлів
+    def _is_file_changed(self):
+        if self._fingerprint is None:
+            return True
+
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return True
+
+        size, mtime, _ = self._fingerprint
+        return (stat.st_size, stat.st_mtime_ns) != (size, mtime) or file_size(self.journal_filename) != self._journal_offset
+
+    # Нотатки з notes.json (зі знімка, якщо він відповідає файлу); запам'ятовує відбиток прочитаного файлу
+    def _read_notes(self):
+        if not os.path.exists(self.filename):
+            atomic_write(self.filename, json.dumps([]))
+
+        cached = self._read_cache()
+        if cached is not None:
+            self._fingerprint, notes = cached
+            return notes
+
+        with open(self.filename, 'rb') as file:
+            content = file.read()
+
+        data = json.loads(content)
+        self._fingerprint = file_fingerprint(self.filename, content)
+        self._write_cache(data, self._fingerprint)
+        return [_note_from_dict(note) for note in data]
 
-    def load_notes(self): # Завантажує нотатки з JSON-файлу.
-        with open(self.filename, 'r') as file:
-            data = json.load(file)
-            self.notes = [Note(note['title'], note['content'], note['tags']) for note in data]
+    # Двійковий знімок notes.json: заголовок (pickle) з відбитком notes.json та таблицею (назва, теги, початок і кінець
+    # вмісту), а за ним - вміст усіх нотаток підряд у UTF-8. Знімок лише пришвидшує запуск, тому помилку запису
+    # (наприклад, у Windows, поки старий знімок відкрито через mmap) можна пропустити.
+    def _write_cache(self, items, fingerprint):
+        contents = [item['content'].encode() for item in items]
+        table = []
+        start = 0
+
+        for item, content in zip(items, contents):
+            table.append((item['title'], item['tags'], start, start + len(content)))
+            start += len(content)
+
+        header = pickle.dumps((CACHE_VERSION, fingerprint, table), protocol=5)
+
+        try:
+            atomic_write(self.cache_filename, header + b''.join(contents))
+        except OSError:
+            # відкритий через mmap знімок не можна й видалити; він лишається, але з чужим відбитком не читається
+            try:
+                remove_file(self.cache_filename)
+            except OSError:
+                pass
+
+    # (відбиток notes.json, нотатки зі знімка з вмістом, який читається з mmap під час першого звернення), або None,
+    # якщо знімка немає чи він не відповідає notes.json
+    def _read_cache(self):
+        try:
+            with open(self.cache_filename, 'rb') as reader:
+                version, fingerprint, table = pickle.load(reader)
+
+                if version != CACHE_VERSION or not is_same_file(self.filename, fingerprint):
+                    return None
+
+                # той самий вміст міг отримати новий mtime
+                fingerprint = fingerprint[0], os.stat(self.filename).st_mtime_ns, fingerprint[2]
+                offset = reader.tell()
+                content_map = mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+
+        notes = []
+        for title, tags, start, end in table:
+            note = Note(title, None, tags)
+            note._content_span = content_map, offset + start, offset + end
+            notes.append(note)
+
+        return fingerprint, notes
+
+    # Застосовує зміни, збережені іншими сесіями після останнього load/save цієї, лишаючи її незбережені зміни
+    def _merge_saved(self, stamp):
+        # notes.json переписали (складання журналу іншою сесією, зміна поза програмою) або журнал став коротшим
+        is_rewritten = (stamp.get('compacted', 0) > self._version or not is_same_file(self.filename, self._fingerprint)
+                        or file_size(self.journal_filename) < self._journal_offset)
+
+        if not is_rewritten:
+            # лише нові записи журналу після вже відомого зміщення
+            self._apply_journal(read_json_lines(self.journal_filename, self._journal_offset))
+            return
+
+        # журнал, який знала ця сесія, вже складено в новий notes.json - порівнюється весь стан
+        saved = {}
+        for note in self._read_notes():
+            saved.setdefault(note.title.casefold(), note)
+
+        journal = read_json_lines(self.journal_filename)
+        for entry in journal:
+            if entry['op'] == 'put':
+                saved[entry['note']['title'].casefold()] = _note_from_dict(entry['note'])
+            else:
+                saved.pop(entry['title'], None)
+
+        for title in [title for title in self._notes if title not in saved and title not in self._dirty]:
+            self._drop_note(title)
+
+        for title, note in saved.items():
+            if title not in self._dirty and _note_state(self._notes.get(title)) != _note_state(note):
+                self._set_note(title, note)
+
+        self._journal_size = len(journal)
+
+    # Відтворює записи журналу; нотатки з незбереженими змінами цієї сесії лишаються як є
+    def _apply_journal(self, journal):
+        for entry in journal:
+            if entry['op'] == 'put':
+                title = entry['note']['title'].casefold()
+                if title not in self._dirty:
+                    self._set_note(title, _note_from_dict(entry['note']))
+            elif entry['title'] not in self._dirty:
+                self._drop_note(entry['title'])
+
+        self._journal_size += len(journal)
+
+    # Складає журнал у новий notes.json. Стан береться з файлів, а не з пам'яті, тож сесія тим часом може змінювати
+    # нотатки; запис через тимчасовий файл і перейменування, тому після збою лишається старий notes.json з журналом
+    # або новий без нього.
+    def _compact(self):
+        with self._save_lock, FileLock(self.filename) as lock, STATS.storage_timer('notebook', 'compact'):
+            stamp = lock.read_stamp()
+
+            with open(self.filename, 'rb') as file:
+                saved = {}
+                for item in json.loads(file.read()):
+                    saved.setdefault(item['title'].casefold(), item)
+
+            for entry in read_json_lines(self.journal_filename):
+                if entry['op'] == 'put':
+                    saved[entry['note']['title'].casefold()] = entry['note']
+                else:
+                    saved.pop(entry['title'], None)
+
+            content = json.dumps(list(saved.values())).encode()
+            atomic_write(self.filename, content)
+            fingerprint = file_fingerprint(self.filename, content)
+            self._write_cache(list(saved.values()), fingerprint)
+            remove_file(self.journal_filename)
+
+            # зміщення в журналі в усіх сесій застаріли: новий штамп змушує їх порівняти весь стан
+            is_current = stamp.get('version', 0) == self._version
+            stamp['version'] = stamp['compacted'] = stamp.get('version', 0) + 1
+            lock.write_stamp(stamp)
+
+            # ніхто не зберігав після цієї сесії, тож файл - її стан і порівнювати нічого
+            if is_current:
+                self._fingerprint = fingerprint
+                self._version = stamp['version']
+                self._journal_offset = 0
+                self._journal_size = 0
+
+
+def _note_to_dict(note):
+    return {'title': note.title, 'content': note.content, 'tags': note.tags}
+
+
+def _note_from_dict(item):
+    return Note(item['title'], item['content'], item['tags'])
+
+
+# Теги без повторів, без урахування регістру; з однакових лишається перший
+def _unique_tags(tags):
+    unique = {}
+    for tag in tags:
+        unique.setdefault(tag.casefold(), tag)
+    return list(unique.values())
+
+
+# (заголовок, вміст, теги) нотатки для порівняння при злитті, None - нотатки немає
+def _note_state(note):
+    if note is None:
+        return None
+
+    return note.title, note.content, tuple(note.tags)
 
 
 class UserInterface(ABC):
@@ -153,9 +538,13 @@ class ConsoleUI(UserInterface):
         print("tag = Add Tag(Додати тег)")
         print("sort = Sort Notes(Сортування)")
         print("list = List Notes(Вивести список)")
+        print("tags = Tag Counts(Теги та кількість нотаток)")
+        print("filter = Notes by Tags(Нотатки з усіма або будь-яким із тегів)")
+        print("related = Related Tags(Теги, що трапляються разом із тегом)")
         print("search = Search Notes(Пошук)")
         print("load = Load Notes(Завантаження)")
         print("save = Save Notes(Зберігання)")
+        print("stats = Statistics (Статистика сесії, з JASON_STATS=1)")
         print("exit = Exit (and save)")
         print('=' * 10)
 
@@ -177,19 +566,41 @@ class ConsoleUI(UserInterface):
 
 
 # Команди, які підтримує бот.
-commands = ["add", "edit", "delete", "tag", "sort", "list", "search", "load", "save", "exit"]
+commands = ["add", "edit", "delete", "tag", "sort", "list", "tags", "filter", "related", "search", "load", "save", "stats",
+            "exit"]
 
-# Створення автозавершення для команд.
-command_completer = WordCompleter(commands, ignore_case=True)
+# Автозавершення для команд, створюється під час першого запиту команди.
+command_completer = None
 
 def get_command_from_user():
+    global command_completer
+
+    # без термінала (введення зі скрипта) команда читається звичайним input
+    if not sys.stdin.isatty():
+        return input("Enter a command: ")
+
+    # prompt_toolkit імпортується довше за весь блокнот, тому лише коли інтерфейс уже запущено
+    from prompt_toolkit import prompt
+    from prompt_toolkit.completion import WordCompleter
+
+    if command_completer is None:
+        command_completer = WordCompleter(commands, ignore_case=True)
+
     return prompt("Enter a command: ", completer=command_completer)
 
+# Блокнот у файлі: база SQLite для файлів .db/.sqlite, notes.json з журналом для решти
+def open_notebook(filename="notes.json"):
+    if filename.endswith(('.db', '.sqlite', '.sqlite3')):
+        from note_book_sqlite import SqliteNotebook
+        return SqliteNotebook(filename)
+
+    return Notebook(filename)
+
 def main():
   
-    filename = "notes.json"
-    notebook = Notebook(filename)
-    notebook.load_notes()
+    # JASON_NOTEBOOK=notes.db зберігає блокнот у базі SQLite
+    filename = os.environ.get("JASON_NOTEBOOK", "notes.json")
+    notebook = open_notebook(filename)
     ui = ConsoleUI()  # Створюємо об'єкт консольного інтерфейсу
 
     while True:
@@ -198,134 +609,157 @@ def main():
         '''user_input = ui.get_user_input("Enter a command: ")'''
       
         user_input = get_command_from_user()
+        command = user_input.casefold()
 
-        if user_input.casefold() == "add":
-            # Додати нотатку.
-            try:
-                title = input("Enter Title: ")
-                if len(title) < 5:
-                    raise InvalidFormatError("Invalid format. Title length should be >= 5.")
-            except InvalidFormatError as error:
-                print(error)
-            else:
+        # зміни файлу поза цією сесією (інша сесія, редактор) зливаються перед кожною командою
+        if notebook.refresh_notes():
+            print("Notes were changed outside this session, the changes are merged.")
+
+        # typos would each get their own metric otherwise
+        with STATS.command_timer('notebook', command if command in commands or command == 'reset' else 'unknown'):
+
+            if user_input.casefold() == "add":
+                # Додати нотатку.
                 try:
-                    content = input("Enter content: ")
-                    if len(content) < 10:
-                        raise InvalidFormatError("Invalid format. Content length should be >= 10.")
+                    title = input("Enter Title: ")
+                    if len(title) < 5:
+                        raise InvalidFormatError("Invalid format. Title length should be >= 5.")
                 except InvalidFormatError as error:
                     print(error)
                 else:
-                    tags = input("Enter Tags (comma-separated or space-separated): ")
-                    tags = [tag.strip() for tag in tags.replace(',', ' ').split()]
-                    note = Note(title, content, tags)
-                    notebook.add_note(note)
+                    try:
+                        content = input("Enter content: ")
+                        if len(content) < 10:
+                            raise InvalidFormatError("Invalid format. Content length should be >= 10.")
+                    except InvalidFormatError as error:
+                        print(error)
+                    else:
+                        tags = input("Enter Tags (comma-separated or space-separated): ")
+                        tags = [tag.strip() for tag in tags.replace(',', ' ').split()]
+                        note = Note(title, content, tags)
+                        notebook.add_note(note)
                        
                        
-        elif user_input.casefold() == "edit":
-            # Редагувати нотатку.
-            title = input("Enter the title of the note to edit: ")
-
-            if notebook.edit_note(title):
-                print("Note edited!")
-
-        elif user_input.casefold() == "delete":
-            # Видалити нотатку.
-            title = input("Enter the title of the note to delete: ").strip()
-            if notebook.delete_note(title.casefold()):
-                print("Note deleted!")
-            else:
-                print("Note not found!")
+            elif user_input.casefold() == "edit":
+                # Редагувати нотатку.
+                title = input("Enter the title of the note to edit: ")
+
+                if notebook.edit_note(title):
+                    print("Note edited!")
+
+            elif user_input.casefold() == "delete":
+                # Видалити нотатку.
+                title = input("Enter the title of the note to delete: ").strip()
+                if notebook.delete_note(title.casefold()):
+                    print("Note deleted!")
+                else:
+                    print("Note not found!")
 
-        elif user_input.casefold() == "tag":
-            # Додати тег до нотатки.
-            title = input("Enter the title of the note to add a tag: ")
-            note = notebook.find_note(title)
+            elif user_input.casefold() == "tag":
+                # Додати тег до нотатки.
+                title = input("Enter the title of the note to add a tag: ")
+                note = notebook.find_note(title)
 
-            if note is None:
-                print("Note not found!")
+                if note is None:
+                    print("Note not found!")
                 
-            else:
-                new_tags_input = input("Enter the new tags (comma-separated or space-separated): ")
-                new_tags = [tag.strip() for tag in new_tags_input.replace(',', ' ').split()]
+                else:
+                    new_tags_input = input("Enter the new tags (comma-separated or space-separated): ")
+                    new_tags = [tag.strip() for tag in new_tags_input.replace(',', ' ').split()]
     
-                if not new_tags:
-                    print("Invalid format. Tags can't be empty.")
+                    if not new_tags:
+                        print("Invalid format. Tags can't be empty.")
           
-                elif all(len(tag) < 20 for tag in new_tags):
+                    elif all(len(tag) < 20 for tag in new_tags):
               
-                    if any(tag.casefold() in note.tags for tag in new_tags):
-                        print("Some tags already exist for this note.")
-                    else:
-                        note.tags.extend(new_tags)
-                        print("Tags added!")
+                        if any(notebook.has_tag(note, tag) for tag in new_tags):
+                            print("Some tags already exist for this note.")
+                        else:
+                            notebook.add_tags(note, new_tags)
+                            print("Tags added!")
                         
-                else:
-                    print("Invalid format. Tags <= 20.")
-                    
-        elif user_input.casefold() == "sort":
-            # Cортування нотаток.
-            keyword = input("Enter a keyword to sort notes by: ")
-            
-            notes_with_priority = []
-            
-            for note in notebook.notes:
-                priority = 0
-                
-                if any(keyword in tag.lower() for tag in note.tags):
-                    priority += 3
-                    
-                if keyword in note.title.lower():
-                    priority += 2
-                    
-                if keyword in note.content.lower():
-                    priority += 1
+                    else:
+                        print("Invalid format. Tags <= 20.")
                     
-                notes_with_priority.append((note, priority))
-            sorted_notes = sorted(notes_with_priority, key=lambda x: x[1], reverse=True)
-            
-            for note, _ in sorted_notes:
-                print(note)
+            elif user_input.casefold() == "sort":
+                # Cортування нотаток.
+                keyword = input("Enter a keyword to sort notes by: ")
 
+                for note in notebook.sort_notes(keyword):
+                    print(note)
 
-        elif user_input.casefold() == "list":
-            # Вивести список нотаток.
-            notebook.list_notes()
 
-        elif user_input.casefold() == "search":
-            # Пошук нотаток за ключовим словом.
-            keyword = input("Enter the keyword to search notes by: ")
-            matching_notes = notebook.search_notes(keyword)
-            if matching_notes:
-                print("Found notes:")
-                for note in matching_notes:
-                    print(note)
-            else:
-                print("No notes found.")
+            elif user_input.casefold() == "list":
+                # Вивести список нотаток.
+                notebook.list_notes()
+
+            elif user_input.casefold() == "tags":
+                # Теги за кількістю нотаток.
+                tag_counts = notebook.tag_counts()
+                if not tag_counts:
+                    print("No tags available.")
+                for tag, count in tag_counts:
+                    print(f"{tag}: {count}")
+
+            elif user_input.casefold() == "filter":
+                # Нотатки з усіма або будь-яким із тегів.
+                tags = input("Enter tags (comma-separated or space-separated): ").replace(',', ' ').split()
+                mode = input("Notes with all the tags or any of them? (all/any): ").strip().casefold()
+                ui.display_notes(notebook.notes_with_tags(tags, match_all=mode != "any"))
+
+            elif user_input.casefold() == "related":
+                # Теги, які трапляються разом із заданим.
+                tag = input("Enter a tag: ").strip()
+                related = notebook.related_tags(tag)
+                if not related:
+                    print("No related tags found.")
+                for other, count in related:
+                    print(f"{other}: {count}")
+
+            elif user_input.casefold() == "search":
+                # Пошук нотаток за ключовим словом.
+                keyword = input("Enter the keyword to search notes by: ")
+                matching_notes = notebook.search_notes(keyword)
+                if matching_notes:
+                    print("Found notes:")
+                    for note in matching_notes:
+                        print(note)
+                else:
+                    print("No notes found.")
 
                 
-        elif user_input.casefold() == "reset":
-            # Завантажити нотатки з файлу
-            # new_filename = input("Enter the filename for loading notes (e.g., notes.json): ")
-            new_filename = 'notes.json'
-            notebook = Notebook(new_filename)
-            notebook.load_notes()
-            print("Notes loaded from the file as it was before the start.")
-
-        elif user_input.casefold() == "save":
-            # Зберегти нотатки у файл.
-            notebook.save_notes()
-            print("Notes saved to the file.")
-
-        elif user_input.casefold() == "exit":
-            #Вийти з програми.
-
-            notebook.save_notes()
-            print("Notes saved to the file.")
-            print("Bye...")
-            break
+            elif user_input.casefold() in ("load", "reset"):
+                # Завантажити нотатки з файлу, скасувавши незбережені зміни.
+                notebook.load_notes()
+                print("Notes loaded from the file.")
+
+            elif user_input.casefold() == "save":
+                # Зберегти нотатки у файл.
+                notebook.save_notes()
+                print("Notes saved to the file.")
+
+            elif user_input.casefold() == "stats":
+                # Статистика сесії: час команд, помилки, завантаження та збереження.
+                if STATS.enabled:
+                    print(STATS.report())
+                    STATS.dump()
+                    print(f"Saved in Prometheus format to {STATS.filename}")
+                else:
+                    print("Statistics are off. Start with JASON_STATS=1 to collect them.")
+
+            elif user_input.casefold() == "exit":
+                #Вийти з програми.
+
+                notebook.save_notes()
+                print("Notes saved to the file.")
+                print("Bye...")
+                STATS.dump()
+                break
+            
+            else:
+                print('I do not understand the command!')
+
             
-        else:
-            print('I do not understand the command!')
 
             
 if __name__ == "__main__":
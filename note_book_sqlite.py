@@ -0,0 +1,294 @@
+from operator import itemgetter
+
+from note_book import Note, Notebook
+from notes_index import _priority
+from sqlite_storage import SqliteView, UnsavedChanges, connect, select_for_keys
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    note_id INTEGER NOT NULL REFERENCES notes (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    tag_key TEXT NOT NULL,
+    PRIMARY KEY (note_id, position)
+);
+CREATE INDEX IF NOT EXISTS tags_tag_key ON tags (tag_key, note_id);
+'''
+
+# Substring search ranked by BM25
+TEXT_INDEX_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_text USING fts5 (title, content, tags, tokenize = 'trigram')
+'''
+
+# BM25 weights of the notes_text columns (title, content, tags): the same tags > title > content as the JSON notebook
+BM25 = 'bm25(notes_text, 2.0, 1.0, 3.0)'
+
+# Trigram queries need at least this many characters
+NGRAM_SIZE = 3
+
+# Columns of the note rows, tags are glued in their order
+SELECT_NOTES = '''
+SELECT notes.id, notes.key, notes.title, notes.content,
+       (SELECT group_concat(tag, char(10)) FROM (SELECT tag FROM tags WHERE note_id = notes.id ORDER BY position))
+FROM notes
+'''
+
+# 3 for a tag, 2 for the title, 1 for the content that contain :keyword, as the 'sort' command counts them
+PRIORITY = '''
+(notes.id IN (SELECT note_id FROM tags WHERE instr(lower_text(tag), :keyword))) * 3
++ (instr(lower_text(notes.title), :keyword) > 0) * 2
++ (instr(lower_text(notes.content), :keyword) > 0)
+'''
+
+
+"""Class SqliteNotebook зберігає нотатки у базі SQLite замість notes.json: таблиці нотаток і тегів та повнотекстовий
+індекс FTS5. Нотатки читаються з бази лише тоді, коли потрібні, тому великий блокнот відкривається одразу, а пошук,
+сортування та запити за тегами виконуються запитами до бази. Незбережені зміни сесії лежать у пам'яті
+(UnsavedChanges) і записуються до бази командою save."""
+class SqliteNotebook(Notebook):
+
+    def __init__(self, filename='notes.db'):
+        self.connection = None
+        self._changes = UnsavedChanges()
+        super().__init__(filename)
+
+    # the first call opens the database, later ones drop the unsaved changes like reading the file again would
+    def load_notes(self):
+        if self.connection is not None:
+            self._changes.clear()
+            self._dirty.clear()
+            return
+
+        # SQLite lower() changes only ASCII letters, Cyrillic notes are compared in Python's lower case
+        self.connection, self.has_text_index = connect(self.filename, SCHEMA, TEXT_INDEX_SCHEMA,
+                                                       [('lower_text', str.lower)])
+        self._notes = SqliteView(self)
+
+    # every query reads the database, changes of other connections are seen without reloading
+    def refresh_notes(self):
+        return False
+
+    # Writes the changed notes in one transaction; on a conflict over the same note the later save wins
+    def save_notes(self):
+        with self.connection:
+            for key, note in self._changes.in_order():
+                if note is None or self._changes.is_moved(key):
+                    self._delete_row(key)
+                if note is not None:
+                    self._write_note(note)
+
+        self._changes.clear()
+        self._dirty.clear()
+
+    def _set_note(self, title, note):
+        self._changes.stage(title, note, self._saved_id)
+
+    def _drop_note(self, title):
+        if title not in self._notes:
+            return False
+
+        self._changes.stage(title, None, self._saved_id)
+        return True
+
+    def _reindex(self, note):
+        self._set_note(note.title.casefold(), note)
+
+    _put = _set_note
+    _remove = _drop_note
+
+    # tags are written with the note
+    def _index_tags(self, title, tags):
+        pass
+
+    def _unindex_tags(self, title, tags):
+        pass
+
+    def _write_note(self, note):
+        self.connection.execute(
+            'INSERT INTO notes (key, title, content) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET title = excluded.title, content = excluded.content',
+            (note.title.casefold(), note.title, note.content))
+        note_id = self._saved_id(note.title.casefold())
+
+        self.connection.execute('DELETE FROM tags WHERE note_id = ?', (note_id,))
+        self.connection.executemany('INSERT INTO tags (note_id, position, tag, tag_key) VALUES (?, ?, ?, ?)',
+                                    [(note_id, position, tag, tag.casefold()) for position, tag in enumerate(note.tags)])
+
+        if self.has_text_index:
+            self.connection.execute('DELETE FROM notes_text WHERE rowid = ?', (note_id,))
+            self.connection.execute('INSERT INTO notes_text (rowid, title, content, tags) VALUES (?, ?, ?, ?)',
+                                    (note_id, note.title, note.content, '\n'.join(note.tags)))
+
+    def _delete_row(self, key):
+        note_id = self._saved_id(key)
+
+        if note_id is not None:
+            self.connection.execute('DELETE FROM notes WHERE id = ?', (note_id,))
+            if self.has_text_index:
+                self.connection.execute('DELETE FROM notes_text WHERE rowid = ?', (note_id,))
+
+    def _saved_id(self, key):
+        row = self.connection.execute('SELECT id FROM notes WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _saved_item(self, key):
+        return next((note for _, _, note in self._rows('WHERE notes.key = ?', (key,))), None)
+
+    def _saved_rows(self):
+        return self._rows('ORDER BY notes.id')
+
+    def _saved_keys(self):
+        return self.connection.execute('SELECT id, key FROM notes ORDER BY id')
+
+    # Saved notes, all of them or those with the given keys
+    def _count_saved(self, keys=None) -> int:
+        if keys is None:
+            return self.connection.execute('SELECT count(*) FROM notes').fetchone()[0]
+
+        return len(select_for_keys(self.connection, 'SELECT 1 FROM notes WHERE key IN ({})', keys))
+
+    # (id, key, note) for the rows of SELECT_NOTES with the given condition, read in batches
+    def _rows(self, condition='', params=()):
+        cursor = self.connection.execute(SELECT_NOTES + condition, params)
+
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+
+            for note_id, key, title, content, tags in rows:
+                yield note_id, key, Note(title, content, tags.split('\n') if tags else [])
+
+    # Whether the keyword can be looked up in the text index instead of checking every note
+    def _text_match(self, keyword):
+        return self.has_text_index and len(keyword) >= NGRAM_SIZE and '\n' not in keyword
+
+    def search_notes(self, keyword):
+        keyword = keyword.lower()
+        changed = [row for row in self._changes.changed() if _priority(row[2], keyword)]
+
+        if not self._text_match(keyword):
+            rows = self._rows(f'WHERE ({PRIORITY}) > 0 ORDER BY notes.id', {'keyword': keyword})
+            return [note for _, _, note in self._changes.merge(rows, changed)]
+
+        rows = self._rows(
+            f'JOIN (SELECT rowid, {BM25} AS score FROM notes_text WHERE notes_text MATCH :phrase) AS found '
+            'ON found.rowid = notes.id ORDER BY found.score, notes.id',
+            {'phrase': _phrase(keyword)})
+
+        # unsaved notes have no BM25 score in the database: they go after the saved ones, by priority
+        changed.sort(key=lambda row: (-_priority(row[2], keyword), row[0]))
+        return [note for _, _, note in list(self._changes.merge(rows, [])) + changed]
+
+    def sort_notes(self, keyword):
+        keyword = keyword.lower()
+
+        def priority(row):
+            return -_priority(row[2], keyword)
+
+        if not self._text_match(keyword):
+            rows = self._rows(f'ORDER BY ({PRIORITY}) DESC, notes.id', {'keyword': keyword})
+            return [note for _, _, note in self._changes.merge(
+                rows, self._changes.changed(), lambda row: (priority(row), row[0]))]
+
+        params = {'keyword': keyword, 'phrase': _phrase(keyword)}
+        found = self._rows(
+            f'JOIN (SELECT rowid, {BM25} AS score FROM notes_text WHERE notes_text MATCH :phrase) AS found '
+            f'ON found.rowid = notes.id ORDER BY ({PRIORITY}) DESC, found.score, notes.id', params)
+        rest = self._rows('WHERE notes.id NOT IN (SELECT rowid FROM notes_text WHERE notes_text MATCH :phrase) '
+                          'ORDER BY notes.id', params)
+        changed = self._changes.changed()
+
+        # an unsaved note goes after the saved ones with the same priority, as it has no BM25 score
+        found = sorted(list(self._changes.merge(found, [])) + sorted((row for row in changed if priority(row)), key=itemgetter(0)),
+                       key=priority)
+        rest = self._changes.merge(rest, [row for row in changed if not priority(row)])
+        return [note for _, _, note in found + list(rest)]
+
+    def has_tag(self, note, tag):
+        key = note.title.casefold()
+
+        if key in self._changes:
+            changed = self._changes.items[key]
+            return changed is not None and tag.casefold() in [other.casefold() for other in changed.tags]
+
+        row = self.connection.execute(
+            'SELECT 1 FROM tags JOIN notes ON notes.id = tags.note_id WHERE notes.key = ? AND tag_key = ?',
+            (key, tag.casefold())).fetchone()
+        return row is not None
+
+    def notes_with_tags(self, tags, match_all=True):
+        keys = list(dict.fromkeys(tag.casefold() for tag in tags))
+        if not keys:
+            return []
+
+        condition = (f'WHERE notes.id IN (SELECT note_id FROM tags WHERE tag_key IN ({", ".join("?" * len(keys))}) '
+                     'GROUP BY note_id')
+        params = keys
+
+        if match_all:
+            condition += ' HAVING count(DISTINCT tag_key) = ?'
+            params = keys + [len(keys)]
+
+        matches = all if match_all else any
+        changed = [row for row in self._changes.changed()
+                   if matches(key in {tag.casefold() for tag in row[2].tags} for key in keys)]
+        rows = self._rows(condition + ') ORDER BY lower_text(notes.title)', params)
+        return [note for _, _, note in self._changes.merge(rows, changed, lambda row: row[2].title.lower())]
+
+    def tag_counts(self):
+        counts = dict(self.connection.execute('SELECT tag_key, count(DISTINCT note_id) FROM tags GROUP BY tag_key'))
+
+        for tag_keys, change in self._changed_tag_keys():
+            for tag in tag_keys:
+                counts[tag] = counts.get(tag, 0) + change
+
+        return _ranked(counts)
+
+    def related_tags(self, tag):
+        tag = tag.casefold()
+        counts = dict(self.connection.execute(
+            'SELECT other.tag_key, count(DISTINCT other.note_id) FROM tags AS this '
+            'JOIN tags AS other ON other.note_id = this.note_id '
+            'WHERE this.tag_key = ? AND other.tag_key != ? GROUP BY other.tag_key', (tag, tag)))
+
+        for tag_keys, change in self._changed_tag_keys():
+            if tag in tag_keys:
+                for other in tag_keys - {tag}:
+                    counts[other] = counts.get(other, 0) + change
+
+        return _ranked(counts)
+
+    # (tag keys, -1) of the saved versions of the changed notes and (tag keys, 1) of their unsaved versions,
+    # to correct the counts the database gives
+    def _changed_tag_keys(self):
+        if not self._changes:
+            return
+
+        saved = {}
+        rows = select_for_keys(self.connection, 'SELECT notes.key, tag_key FROM tags JOIN notes ON notes.id = tags.note_id '
+                                                'WHERE notes.key IN ({})', self._changes.items)
+        for key, tag_key in rows:
+            saved.setdefault(key, set()).add(tag_key)
+
+        for tag_keys in saved.values():
+            yield tag_keys, -1
+
+        for _, _, note in self._changes.changed():
+            yield {tag.casefold() for tag in note.tags}, 1
+
+
+# (tag, count) with the most frequent tags first
+def _ranked(counts) -> list:
+    return sorted(((tag, count) for tag, count in counts.items() if count > 0), key=lambda item: (-item[1], item[0]))
+
+
+# FTS5 string that matches the keyword as one substring
+def _phrase(keyword):
+    return '"' + keyword.replace('"', '""') + '"'
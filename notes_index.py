@@ -0,0 +1,208 @@
+import math
+import re
+
+# Weights of the note fields in the ranking, the same order of importance 'sort' always had
+FIELD_WEIGHTS = {'tags': 3, 'title': 2, 'content': 1}
+
+# BM25 parameters: saturation of the term frequency and normalization by the field length
+K1 = 1.2
+B = 0.75
+
+# Length of the substrings of the vocabulary index
+NGRAM_SIZE = 3
+
+WORD = re.compile(r'\w+')
+
+
+# Words of the text in lower case, the same case the substring search compares in
+def tokenize(text: str) -> list:
+    return WORD.findall(text.lower())
+
+
+def _ngrams(term: str) -> set:
+    return {term[i:i + NGRAM_SIZE] for i in range(len(term) - NGRAM_SIZE + 1)}
+
+
+def _field_texts(note) -> dict:
+    return {'tags': [tag.lower() for tag in note.tags], 'title': [note.title.lower()], 'content': [note.content.lower()]}
+
+
+# 3 for a tag, 2 for the title, 1 for the content that contain the keyword, summed like the old 'sort' did
+def _priority(note, keyword) -> int:
+    priority = 0
+
+    for field, texts in _field_texts(note).items():
+        if any(keyword in text for text in texts):
+            priority += FIELD_WEIGHTS[field]
+
+    return priority
+
+
+"""Class NotesIndex - інвертований індекс нотаток: для кожного слова тегів, заголовків та вмісту - нотатки, де воно
+є, і скільки разів. Пошук підрядка розгортається у слова словника, які його містять (через індекс триграм словника),
+тому запит обходить лише списки цих слів. Результати ранжуються за BM25 з вагами полів: теги > заголовок > вміст."""
+class NotesIndex:
+
+    def __init__(self):
+        self.postings = {field: {} for field in FIELD_WEIGHTS}  # field -> word -> {note key: occurrences}
+        self.lengths = {field: {} for field in FIELD_WEIGHTS}  # field -> note key -> words in the field
+        self.total_lengths = dict.fromkeys(FIELD_WEIGHTS, 0)
+        self.notes = {}  # note key -> Note
+        self.words = {}  # note key -> field -> indexed words; the note itself may already be edited on removal
+        self.order = {}  # note key -> insertion number, ties are shown in the notebook order
+        self._next_order = 0
+        self._terms = {}  # word -> number of (field, note) postings, the word leaves the vocabulary at 0
+        self._grams = {}  # trigram -> words of the vocabulary that contain it
+
+    def add(self, key, note):
+        if key in self.notes:
+            self._unindex(key)
+        else:
+            self.order[key] = self._next_order
+            self._next_order += 1
+
+        self.notes[key] = note
+        self.words[key] = {}
+
+        for field, texts in _field_texts(note).items():
+            words = [word for text in texts for word in tokenize(text)]
+            postings = self.postings[field]
+
+            for word in words:
+                note_counts = postings.get(word)
+                if note_counts is None:
+                    note_counts = postings[word] = {}
+                if key not in note_counts:
+                    note_counts[key] = 0
+                    self._add_term(word)
+                note_counts[key] += 1
+
+            self.words[key][field] = set(words)
+            self.lengths[field][key] = len(words)
+            self.total_lengths[field] += len(words)
+
+    def remove(self, key):
+        if key in self.notes:
+            self._unindex(key)
+            del self.notes[key]
+            del self.order[key]
+
+    def _unindex(self, key):
+        for field, words in self.words.pop(key).items():
+            postings = self.postings[field]
+
+            for word in words:
+                note_counts = postings[word]
+                del note_counts[key]
+                if not note_counts:
+                    del postings[word]
+                self._discard_term(word)
+
+            self.total_lengths[field] -= self.lengths[field].pop(key)
+
+    def _add_term(self, word):
+        if word not in self._terms:
+            self._terms[word] = 0
+            for gram in _ngrams(word):
+                self._grams.setdefault(gram, set()).add(word)
+
+        self._terms[word] += 1
+
+    def _discard_term(self, word):
+        self._terms[word] -= 1
+
+        if not self._terms[word]:
+            del self._terms[word]
+            for gram in _ngrams(word):
+                words = self._grams[gram]
+                words.discard(word)
+                if not words:
+                    del self._grams[gram]
+
+    # Words of the vocabulary that contain the part; short parts are looked for in the vocabulary itself
+    def _expand(self, part) -> set:
+        if len(part) < NGRAM_SIZE:
+            return {word for word in self._terms if part in word}
+
+        candidates = None
+        for gram in _ngrams(part):
+            words = self._grams.get(gram, set())
+            candidates = set(words) if candidates is None else candidates & words
+            if not candidates:
+                return set()
+
+        return {word for word in candidates if part in word}
+
+    # note key -> (priority, BM25 score) of the notes that contain the keyword as a substring
+    def _match(self, keyword) -> dict:
+        parts = tokenize(keyword)
+
+        # no words to look up, e.g. only punctuation: the old full scan
+        if not parts:
+            return {key: (priority, 0.0) for key, note in self.notes.items()
+                    if (priority := _priority(note, keyword))}
+
+        # a word keyword is a substring of the text exactly when it is a substring of one of its words,
+        # the keyword with spaces or punctuation is checked against the text of the notes that have all its parts
+        is_word = parts == [keyword]
+        expanded = [self._expand(part) for part in parts]
+        scores = self._scores(set().union(*expanded))
+
+        if is_word:
+            return {key: (sum(FIELD_WEIGHTS[field] for field in fields), score)
+                    for key, (fields, score) in scores.items()}
+
+        candidates = None
+        for words in expanded:
+            keys = {key for word in words for field in FIELD_WEIGHTS for key in self.postings[field].get(word, ())}
+            candidates = keys if candidates is None else candidates & keys
+
+        found = {}
+        for key in candidates:
+            priority = _priority(self.notes[key], keyword)
+            if priority:
+                found[key] = (priority, scores[key][1])
+
+        return found
+
+    # note key -> (fields where the words are, BM25F score) for the notes that have any of the words
+    def _scores(self, words) -> dict:
+        count = len(self.notes)
+        average = {field: (self.total_lengths[field] / count if count else 0) or 1 for field in FIELD_WEIGHTS}
+        results = {}
+
+        for word in words:
+            weighted = {}  # note key -> field-weighted, length-normalized frequency of the word
+
+            for field, weight in FIELD_WEIGHTS.items():
+                lengths = self.lengths[field]
+
+                for key, frequency in self.postings[field].get(word, {}).items():
+                    norm = 1 - B + B * lengths[key] / average[field]
+                    weighted[key] = weighted.get(key, 0.0) + weight * frequency / norm
+
+                    if key not in results:
+                        results[key] = (set(), 0.0)
+                    results[key][0].add(field)
+
+            idf = math.log(1 + (count - len(weighted) + 0.5) / (len(weighted) + 0.5))
+
+            for key, frequency in weighted.items():
+                fields, score = results[key]
+                results[key] = (fields, score + idf * frequency / (K1 + frequency))
+
+        return results
+
+    # Notes that contain the keyword, the most relevant first
+    def search(self, keyword) -> list:
+        found = self._match(keyword.lower())
+        keys = sorted(found, key=lambda key: (-found[key][1], self.order[key]))
+        return [self.notes[key] for key in keys]
+
+    # All the notes: with the keyword in tags, title or content first (3/2/1 points), by relevance within the same
+    # points, then the rest in the notebook order
+    def sort(self, keyword) -> list:
+        found = self._match(keyword.lower())
+        keys = sorted(found, key=lambda key: (-found[key][0], -found[key][1], self.order[key]))
+        rest = sorted((key for key in self.notes if key not in found), key=self.order.__getitem__)
+        return [self.notes[key] for key in keys + rest]
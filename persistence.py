@@ -0,0 +1,201 @@
+from contextlib import contextmanager
+import gc
+import hashlib
+import json
+import os
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+# Writes the whole file through a temporary one, so a crash leaves either the old or the new content
+def atomic_write(filename, content) -> None:
+    tmp_filename = f'{filename}.tmp'
+
+    with open(tmp_filename, 'wb' if isinstance(content, bytes) else 'w') as writer:
+        writer.write(content)
+        writer.flush()
+        os.fsync(writer.fileno())
+
+    os.replace(tmp_filename, filename)
+    _fsync_dir(filename)
+
+
+# Appends one compact JSON line per entry and waits until they are on disk
+def append_json_lines(filename, entries) -> int:
+    lines = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+
+    if not lines:
+        return 0
+
+    with open(filename, 'a') as writer:
+        writer.write(lines)
+        writer.flush()
+        os.fsync(writer.fileno())
+
+    return len(entries)
+
+
+# Entries of a JSON lines file from the byte offset on; a torn last line (crash during append) is cut off the file
+def read_json_lines(filename, offset=0) -> list:
+    entries = []
+    good_size = offset
+    is_torn = False
+
+    try:
+        with open(filename, 'rb') as reader:
+            reader.seek(offset)
+            for line in reader:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError
+                    entries.append(json.loads(line))
+                except ValueError:
+                    is_torn = True
+                    break
+                good_size += len(line)
+    except FileNotFoundError:
+        pass
+
+    if is_torn:
+        os.truncate(filename, good_size)
+
+    return entries
+
+
+# (size, mtime, sha1) of the file, or None if there is no such file
+def file_fingerprint(filename, content=None):
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+
+    if content is None:
+        with open(filename, 'rb') as reader:
+            content = reader.read()
+
+    return stat.st_size, stat.st_mtime_ns, hashlib.sha1(content).hexdigest()
+
+
+# True if the file still has the fingerprinted content; the hash is read only when mtime has changed
+def is_same_file(filename, fingerprint) -> bool:
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return False
+
+    size, mtime, sha1 = fingerprint
+
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime_ns == mtime:
+        return True
+
+    return file_fingerprint(filename)[2] == sha1
+
+
+def file_size(filename) -> int:
+    try:
+        return os.path.getsize(filename)
+    except FileNotFoundError:
+        return 0
+
+
+def remove_file(filename) -> None:
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+# Millions of new objects would trigger the cyclic garbage collector over and over
+@contextmanager
+def gc_paused():
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _fsync_dir(filename) -> None:
+    # directories can be opened only on POSIX
+    if os.name != 'posix':
+        return
+
+    fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+"""Class FileLock - виключне блокування файлу даних між процесами через сусідній файл <filename>.lock. Блокування
+тримається лише на час читання чи запису, а у самому lock-файлі лежить штамп версії: сесія порівнює його зі своїм і,
+якщо файл за цей час змінив інший процес, спершу перечитує та зливає чужі зміни."""
+class FileLock:
+
+    def __init__(self, filename):
+        self.lock_filename = f'{filename}.lock'
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.lock_filename, 'a+b')
+
+        try:
+            _lock_file(self._file)
+        except BaseException:
+            self._file.close()
+            raise
+
+        return self
+
+    def __exit__(self, *_):
+        try:
+            _unlock_file(self._file)
+        finally:
+            self._file.close()
+            self._file = None
+
+    # Version stamp written by the last save, an empty dict before the first one
+    def read_stamp(self) -> dict:
+        self._file.seek(0)
+        content = self._file.read()
+
+        try:
+            return json.loads(content) if content else {}
+        except ValueError:
+            return {}
+
+    def write_stamp(self, stamp) -> None:
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(json.dumps(stamp).encode())
+        self._file.flush()
+
+
+def _lock_file(file) -> None:
+    if os.name == 'nt':
+        # LK_LOCK gives up after 10 attempts, a long save of another process may take more
+        while True:
+            file.seek(0)
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(file) -> None:
+    if os.name == 'nt':
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,163 @@
+from collections.abc import MutableMapping
+from operator import itemgetter
+import heapq
+import sqlite3
+
+# Order numbers of the items added in this session: after every saved row, whatever ids other sessions take meanwhile
+NEW_ID = 1 << 62
+
+# Keys in one IN (...) query, well under the SQLite limit of query parameters
+KEYS_PER_QUERY = 500
+
+
+# Opens the database and creates the tables; returns (connection, whether the full-text index could be created).
+# The full-text indexes use the trigram tokenizer, which needs SQLite 3.34+; older versions fall back to a scan
+def connect(filename, schema, text_index_schema, functions=()):
+    # the server saves from a worker thread; the calls that use one connection never overlap
+    connection = sqlite3.connect(filename, check_same_thread=False)
+    # readers do not wait for the writer and the writer does not wait for readers
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA foreign_keys = ON')
+
+    for name, function in functions:
+        connection.create_function(name, 1, function, deterministic=True)
+
+    connection.executescript(schema)
+
+    try:
+        connection.execute(text_index_schema)
+        has_text_index = True
+    except sqlite3.OperationalError:
+        has_text_index = False
+
+    connection.commit()
+    return connection, has_text_index
+
+
+# Rows the query gives for the keys, asked in chunks; the query has one '{}' for the placeholders of the keys
+def select_for_keys(connection, query, keys) -> list:
+    keys = list(keys)
+    rows = []
+
+    for start in range(0, len(keys), KEYS_PER_QUERY):
+        chunk = keys[start:start + KEYS_PER_QUERY]
+        rows.extend(connection.execute(query.format(', '.join('?' * len(chunk))), chunk))
+
+    return rows
+
+
+"""Class UnsavedChanges тримає в пам'яті зміни сесії, ще не записані до бази SQLite: змінений чи доданий елемент
+(або None для видаленого) за ключем. База змінюється лише під час збереження, однією транзакцією, тож відкрита сесія
+не блокує інших, а збій чи вихід без збереження нічого не лишають у файлі, як і з JSON. Запити до бази поєднуються з
+цими змінами через merge."""
+class UnsavedChanges:
+
+    def __init__(self):
+        self.items = {}  # key -> changed item, None if deleted
+        self.ids = {}  # key -> id that keeps the item in its place in the saved order; NEW_ID and up for added ones
+        self._next_id = NEW_ID
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __bool__(self):
+        return bool(self.items)
+
+    # saved_id(key) gives the id of the saved row or None; it is asked only on the first change of the key
+    def stage(self, key, item, saved_id):
+        if key not in self.items:
+            self.ids[key] = saved_id(key)
+            if self.ids[key] is None:
+                self.ids[key] = self._new_id()
+        elif item is not None and self.items[key] is None:
+            # deleted and added again: the item goes to the end, as in the JSON files
+            self.ids[key] = self._new_id()
+
+        self.items[key] = item
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    # Whether the saved row must be deleted before the item is written, so that it goes to the end
+    def is_moved(self, key) -> bool:
+        return self.ids[key] > NEW_ID
+
+    # (key, item) in the order the items take in the book, so that the added ones are written in that order
+    def in_order(self) -> list:
+        return sorted(self.items.items(), key=lambda pair: self.ids[pair[0]])
+
+    def clear(self):
+        self.items.clear()
+        self.ids.clear()
+
+    # (id, key, item) of the changed items that are not deleted
+    def changed(self) -> list:
+        return [(self.ids[key], key, item) for key, item in self.items.items() if item is not None]
+
+    # (id, key, item) rows of the query without the changed keys, merged with the given changed rows;
+    # both go in the order of sort, the rows of the query already are
+    def merge(self, rows, changed, sort=itemgetter(0)):
+        saved = (row for row in rows if row[1] not in self.items)
+        return heapq.merge(saved, sorted(changed, key=sort), key=sort)
+
+
+"""Class SqliteView - словникоподібний вигляд таблиці бази разом з незбереженими змінами сесії, те, чим для команд є
+AddressBook.data чи Notebook._notes. Сховище (storage) дає _changes, збережені _saved_item(key), _saved_id(key),
+рядки (id, key, item) усіх елементів _saved_rows() і пари (id, key) _saved_keys() за id, кількість _count_saved(keys)
+та змінює елементи через _put(key, item) і _remove(key)."""
+class SqliteView(MutableMapping):
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __getitem__(self, key):
+        changes = self.storage._changes
+
+        if key in changes:
+            item = changes.items[key]
+        else:
+            item = self.storage._saved_item(key)
+
+        if item is None:
+            raise KeyError(key)
+
+        return item
+
+    def __setitem__(self, key, item):
+        self.storage._put(key, item)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+
+        self.storage._remove(key)
+
+    def __contains__(self, key):
+        changes = self.storage._changes
+
+        if key in changes:
+            return changes.items[key] is not None
+
+        return self.storage._saved_id(key) is not None
+
+    def __iter__(self):
+        changes = self.storage._changes
+        rows = ((row_id, key, None) for row_id, key in self.storage._saved_keys())
+
+        for _, key, _ in changes.merge(rows, changes.changed()):
+            yield key
+
+    def __len__(self):
+        changes = self.storage._changes
+        return self.storage._count_saved() - self.storage._count_saved(changes.items) + len(changes.changed())
+
+    def values(self):
+        return (item for _, _, item in self._rows())
+
+    def items(self):
+        return ((key, item) for _, key, item in self._rows())
+
+    def _rows(self):
+        changes = self.storage._changes
+        return changes.merge(self.storage._saved_rows(), changes.changed())
@@ -0,0 +1,153 @@
+# Opt-in session statistics: latency histograms and call counts of the commands, errors by exception type
+# and load/save timings. Off unless JASON_STATS is set; the Prometheus text dump goes to JASON_STATS_FILE
+# (jason_stats.prom by default).
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+import os
+
+from persistence import atomic_write
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+"""Class Histogram рахує тривалості по кошиках BUCKETS, як гістограма Prometheus: кожен кошик - кількість значень,
+не більших за його межу."""
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    # Bucket bound below which the given share of the values lies; an estimate, as precise as the buckets are
+    def quantile(self, share):
+        rank = share * self.count
+        total = 0
+
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            total += count
+            if total >= rank:
+                return bound
+
+        return float('inf')
+
+
+"""Class Stats збирає статистику сесії: гістограми тривалості команд і збереження/завантаження та кількість помилок
+за типом виключення. Коли статистику вимкнено, таймери - порожні контекстні менеджери й нічого не записують."""
+class Stats:
+
+    def __init__(self, enabled=False, filename='jason_stats.prom'):
+        self.enabled = enabled
+        self.filename = filename
+        self.current = None  # (program, command) that is running, errors are counted for it
+        self.commands = {}  # (program, command) -> Histogram
+        self.storage = {}  # (program, operation) -> Histogram
+        self.errors = {}  # (program, command, exception type name) -> count
+
+    def command_timer(self, program, command):
+        if not self.enabled:
+            return nullcontext()
+
+        self.current = program, command
+        return self._command_timer(program, command)
+
+    def storage_timer(self, program, operation):
+        if not self.enabled:
+            return nullcontext()
+
+        return self._timer(self.storage, (program, operation))
+
+    # errors that escape the command are counted here, the ones it handles itself are passed to record_error
+    @contextmanager
+    def _command_timer(self, program, command):
+        with self._timer(self.commands, (program, command)):
+            try:
+                yield
+            except Exception as error:
+                self.record_error(program, command, error)
+                raise
+
+    @contextmanager
+    def _timer(self, histograms, key):
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram()
+            histogram.observe(perf_counter() - start)
+
+    def record_error(self, program, command, error):
+        if not self.enabled:
+            return
+
+        key = program, command, type(error).__name__
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    # Table for the 'stats' command
+    def report(self) -> str:
+        lines = [f'{"command":<28} {"calls":>6} {"errors":>6} {"avg ms":>9} {"p50 ms <=":>10} {"p99 ms <=":>10}']
+        errors_by_command = {}
+
+        for (program, command, _), count in self.errors.items():
+            errors_by_command[program, command] = errors_by_command.get((program, command), 0) + count
+
+        for (program, name), histogram in sorted(self.commands.items()) + sorted(self.storage.items()):
+            errors = errors_by_command.get((program, name), 0) if (program, name) in self.commands else ''
+            lines.append(f'{program + ": " + name:<28} {histogram.count:>6} {errors:>6} '
+                         f'{histogram.sum / histogram.count * 1000:>9.3f} '
+                         f'{histogram.quantile(0.5) * 1000:>10.1f} {histogram.quantile(0.99) * 1000:>10.1f}')
+
+        for (program, command, error_type), count in sorted(self.errors.items()):
+            lines.append(f'{program}: {command} failed with {error_type} {count} times')
+
+        return '\n'.join(lines)
+
+    # Prometheus text exposition format
+    def prometheus(self) -> str:
+        lines = []
+
+        for metric, label, histograms in (('jason_command_duration_seconds', 'command', self.commands),
+                                          ('jason_storage_duration_seconds', 'operation', self.storage)):
+            lines.append(f'# TYPE {metric} histogram')
+
+            for (program, name), histogram in sorted(histograms.items()):
+                labels = f'program="{program}",{label}="{_escape(name)}"'
+                total = 0
+
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                    total += count
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {total}')
+
+                lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+
+        lines.append('# TYPE jason_command_errors_total counter')
+        for (program, command, error_type), count in sorted(self.errors.items()):
+            lines.append(f'jason_command_errors_total{{program="{program}",command="{_escape(command)}",'
+                         f'exception="{error_type}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        if self.enabled:
+            atomic_write(self.filename, self.prometheus())
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+STATS = Stats(bool(os.environ.get('JASON_STATS')), os.environ.get('JASON_STATS_FILE', 'jason_stats.prom'))
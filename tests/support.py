@@ -0,0 +1,15 @@
+import os
+import tempfile
+import unittest
+
+
+"""Class TempDirTestCase - тест, якому потрібні файли книги чи блокнота: кожен тест отримує свою тимчасову теку."""
+class TempDirTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
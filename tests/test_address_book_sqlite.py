@@ -0,0 +1,77 @@
+from datetime import date
+import unittest
+
+from address_book import _record_from_row
+from address_book_sqlite import SqliteAddressBook
+from tests.support import TempDirTestCase
+
+
+def _record(name, phone='+380501234567', email=''):
+    return _record_from_row((name, (phone,), date(1990, 5, 17).toordinal(), email, ''))
+
+
+class SqliteAddressBookTest(TempDirTestCase):
+
+    def open_book(self):
+        book = SqliteAddressBook(self.path('save.db'))
+        self.addCleanup(book.connection.close)
+        return book
+
+    def saved_book(self, *names):
+        book = self.open_book()
+        for number, name in enumerate(names):
+            book.add_record(_record(name, f'+38050000000{number}'))
+        book._save()
+        return book
+
+    def test_unsaved_changes_stay_in_the_session(self):
+        self.saved_book('Ann')
+        first, second = self.open_book(), self.open_book()
+        first.add_record(_record('Bob'))
+        first.data['Ann'].add_phone('0671234567')
+
+        # a session with unsaved changes does not lock the file for the others
+        second.add_record(_record('Cid'))
+        second._save()
+
+        self.assertEqual(list(self.open_book().data), ['Ann', 'Cid'])
+        self.assertFalse(self.open_book().has_phone('Ann', '0671234567'))
+
+        first._discard()
+        self.assertEqual(list(self.open_book().data), ['Ann', 'Cid'])
+
+    def test_discard_keeps_what_other_sessions_saved(self):
+        self.saved_book('Ann')
+        first, second = self.open_book(), self.open_book()
+        first.data['Ann'].add_phone('0671234567')
+        second.data['Ann'].set_email('ann@example.com')
+        second._save()
+        first._discard()
+
+        record = self.open_book().data['Ann']
+        self.assertEqual(record.email.value, 'ann@example.com')
+        self.assertEqual([str(phone) for phone in record.phones], ['+380500000000'])
+
+    def test_queries_see_unsaved_changes(self):
+        book = self.saved_book('Ann', 'Bob', 'Kim')
+        book.delete_record('Bob')
+        book.add_record(_record('Lee', '+380671234567'))
+        book.add_record(_record('Bob', '+380931234567', 'bob@example.com'))
+        book.data['Kim'].set_email('kim@example.com')
+
+        self.assertEqual(list(book.data), ['Ann', 'Kim', 'Lee', 'Bob'])
+        self.assertEqual(len(book.data), 4)
+        self.assertNotIn('Cid', book.data)
+        self.assertEqual([record.name.value for record in book.page(2, 1)], ['Kim', 'Lee'])
+        self.assertEqual([record.name.value for record in book.page(2, after='Ann')], ['Bob', 'Kim'])
+        self.assertEqual(book.names_with_prefix('', 3), ['Ann', 'Bob', 'Kim'])
+        self.assertEqual([record.name.value for record in book.search('example.com')], ['Kim', 'Bob'])
+        self.assertEqual([record.name.value for record in book.find_by_phone('0931234567')], ['Bob'])
+        self.assertFalse(book.has_phone('Bob', '+380500000001'))
+
+        book._save()
+        self.assertEqual(list(self.open_book().data), ['Ann', 'Kim', 'Lee', 'Bob'])
+
+
+if __name__ == '__main__':
+    unittest.main()
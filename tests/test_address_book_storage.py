@@ -0,0 +1,90 @@
+from datetime import date
+import unittest
+from unittest import mock
+
+from address_book import AddressBook, _record_from_row
+from tests.support import TempDirTestCase
+
+
+def _record(name, phone='+380501234567'):
+    return _record_from_row((name, (phone,), date(1990, 5, 17).toordinal(), '', ''))
+
+
+class AddressBookStorageTest(TempDirTestCase):
+
+    def open_book(self):
+        return AddressBook(self.path('save.json'))
+
+    def saved_book(self, *names):
+        book = self.open_book()
+        for name in names:
+            book.add_record(_record(name))
+        book._save()
+        return book
+
+
+class AddressBookJournalTest(AddressBookStorageTest):
+
+    def test_saved_book_keeps_the_order(self):
+        book = self.saved_book('Ann', 'Bob', 'Kim')
+        book.delete_record('Ann')
+        book.add_record(_record('Lee'))
+        book.add_record(_record('Ann'))
+        book.delete_record('Bob')
+        book._save()
+
+        self.assertEqual(list(book.data), ['Kim', 'Lee', 'Ann'])
+        self.assertEqual(list(self.open_book().data), ['Kim', 'Lee', 'Ann'])
+
+    def test_unsaved_changes_are_not_written(self):
+        book = self.saved_book('Ann')
+        book.add_record(_record('Bob'))
+        book._discard()
+
+        self.assertEqual(list(self.open_book().data), ['Ann'])
+
+
+# Sessions of the same save.json merge each other's saves; the unsaved changes of a session win
+class AddressBookMergeTest(AddressBookStorageTest):
+
+    def test_saves_of_two_sessions_are_merged(self):
+        first, second = self.open_book(), self.open_book()
+        first.add_record(_record('Ann'))
+        first._save()
+        second.add_record(_record('Bob'))
+        second._save()
+        first._save()
+
+        self.assertEqual(list(first.data), ['Ann', 'Bob'])
+        self.assertEqual(list(self.open_book().data), ['Ann', 'Bob'])
+
+    def test_unsaved_change_wins_over_the_saved_one(self):
+        self.saved_book('Ann', 'Bob')
+        first, second = self.open_book(), self.open_book()
+        first.delete_record('Ann')
+        second.add_record(_record('Ann', '+380671234567'))
+        second.delete_record('Bob')
+        second._save()
+        first._save()
+
+        self.assertEqual(list(self.open_book().data), [])
+
+    def test_merge_after_compaction(self):
+        self.saved_book('Ann', 'Bob')
+        first, second = self.open_book(), self.open_book()
+        first.add_record(_record('Dan'))
+
+        with mock.patch('address_book.JOURNAL_COMPACT_MIN', 0):
+            second.delete_record('Ann')
+            second.add_record(_record('Cid'))
+            second._save()
+
+        first._save()
+
+        # the session added Dan before it saw Cid; the file has them in the order they were saved
+        self.assertEqual(list(first.data), ['Bob', 'Dan', 'Cid'])
+        self.assertEqual(list(self.open_book().data), ['Bob', 'Cid', 'Dan'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+import unittest
+
+from address_book import AddressBook, _birthday_key_ranges, _days_to_birthday, _record_from_row
+from address_book_sqlite import SqliteAddressBook
+from tests.support import TempDirTestCase
+
+# Days the birthday windows are checked from: around 29 February in common and leap years and at the end of the year
+TODAYS = (date(2023, 2, 27), date(2023, 2, 28), date(2023, 3, 1), date(2024, 2, 28), date(2024, 2, 29),
+          date(2024, 3, 1), date(2023, 12, 25), date(2023, 12, 31), date(2024, 12, 31), date(2025, 1, 1))
+
+WINDOWS = (0, 1, 2, 6, 30, 200, 364, 365)
+
+
+# One record for every day of the year, 29 February included
+def _one_birthday_a_day():
+    day = date(2000, 1, 1)
+
+    while day.year == 2000:
+        yield _record_from_row((f'P{day:%m%d}', (f'+38050{day.toordinal() % 10 ** 7:07d}',), day.toordinal(), '', ''))
+        day += timedelta(days=1)
+
+
+class DaysToBirthdayTest(unittest.TestCase):
+
+    def test_29_february_is_celebrated_on_1_march_in_common_years(self):
+        self.assertEqual(_days_to_birthday(date(2000, 2, 29), date(2023, 2, 28)), 1)
+        self.assertEqual(_days_to_birthday(date(2000, 2, 29), date(2023, 3, 1)), 0)
+
+    def test_29_february_in_leap_years(self):
+        self.assertEqual(_days_to_birthday(date(2000, 2, 29), date(2024, 2, 28)), 1)
+        self.assertEqual(_days_to_birthday(date(2000, 2, 29), date(2024, 2, 29)), 0)
+        # the next one is on 1 March 2025, a common year
+        self.assertEqual(_days_to_birthday(date(2000, 2, 29), date(2024, 3, 1)), 365)
+
+    def test_1_march(self):
+        self.assertEqual(_days_to_birthday(date(1990, 3, 1), date(2024, 2, 29)), 1)
+        self.assertEqual(_days_to_birthday(date(1990, 3, 1), date(2023, 2, 28)), 1)
+        self.assertEqual(_days_to_birthday(date(1990, 3, 1), date(2023, 3, 2)), 365)
+
+    def test_next_year(self):
+        self.assertEqual(_days_to_birthday(date(1990, 1, 2), date(2023, 12, 30)), 3)
+        self.assertEqual(_days_to_birthday(date(1990, 12, 31), date(2023, 12, 31)), 0)
+        self.assertEqual(_days_to_birthday(date(1990, 12, 30), date(2023, 12, 31)), 365)
+
+
+class BirthdayKeyRangesTest(unittest.TestCase):
+
+    def test_window_within_the_year(self):
+        self.assertEqual(_birthday_key_ranges(9, date(2024, 2, 20)), [(51, 60)])
+
+    def test_1_march_of_a_common_year_includes_29_february(self):
+        self.assertEqual(_birthday_key_ranges(0, date(2023, 3, 1)), [(60, 61)])
+        self.assertEqual(_birthday_key_ranges(0, date(2024, 3, 1)), [(61, 61)])
+
+    def test_window_past_31_december(self):
+        self.assertEqual(_birthday_key_ranges(7, date(2023, 12, 28)), [(363, 366), (1, 4)])
+
+    def test_whole_year(self):
+        self.assertEqual(_birthday_key_ranges(365, date(2023, 6, 1)), [(1, 366)])
+
+
+# birthdays_within must find exactly the records whose next birthday is at most 'days' days away, the nearest first
+def check_birthdays_within(test, book, records):
+    for today in TODAYS:
+        for days in WINDOWS:
+            with test.subTest(today=today, days=days):
+                found = book.birthdays_within(days, today)
+                distances = [distance for distance, _ in found]
+                expected = sorted(record.name.value for record in records
+                                  if _days_to_birthday(record.birthday.value, today) <= days)
+
+                test.assertEqual(sorted(record.name.value for _, record in found), expected)
+                test.assertEqual(distances, [_days_to_birthday(record.birthday.value, today) for _, record in found])
+                test.assertEqual(distances, sorted(distances))
+
+
+class AddressBookBirthdaysTest(TempDirTestCase):
+
+    def test_matches_days_to_birthday(self):
+        book = AddressBook(self.path('save.json'))
+        records = list(_one_birthday_a_day())
+        book.add_records(records)
+
+        check_birthdays_within(self, book, records)
+
+
+class SqliteAddressBookBirthdaysTest(TempDirTestCase):
+
+    def test_matches_days_to_birthday(self):
+        book = SqliteAddressBook(self.path('save.db'))
+        self.addCleanup(book.connection.close)
+        records = list(_one_birthday_a_day())
+        book.add_records(records)
+
+        check_birthdays_within(self, book, records)
+        book._save()
+        check_birthdays_within(self, book, records)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+from contextlib import redirect_stdout
+import io
+import unittest
+
+from note_book import Note
+from note_book_sqlite import SqliteNotebook
+from tests.support import TempDirTestCase
+
+
+class SqliteNotebookTest(TempDirTestCase):
+
+    def open_notebook(self):
+        notebook = SqliteNotebook(self.path('notes.db'))
+        self.addCleanup(notebook.connection.close)
+        return notebook
+
+    def saved_notebook(self, *notes):
+        notebook = self.open_notebook()
+        self.add_notes(notebook, *notes)
+        notebook.save_notes()
+        return notebook
+
+    @staticmethod
+    def add_notes(notebook, *notes):
+        with redirect_stdout(io.StringIO()):
+            for title, content, tags in notes:
+                notebook.add_note(Note(title, content, tags))
+
+    @staticmethod
+    def titles(notes):
+        return [note.title for note in notes]
+
+    def test_unsaved_changes_stay_in_the_session(self):
+        self.saved_notebook(('Alpha', 'first note text', ['work']))
+        first, second = self.open_notebook(), self.open_notebook()
+        self.add_notes(first, ('Beta', 'second note text', []))
+
+        # a session with unsaved changes does not lock the file for the others
+        self.add_notes(second, ('Gamma', 'third note text', []))
+        second.save_notes()
+
+        self.assertEqual(self.titles(self.open_notebook().notes), ['Alpha', 'Gamma'])
+
+        first.load_notes()
+        self.assertEqual(self.titles(first.notes), ['Alpha', 'Gamma'])
+
+    def test_load_keeps_what_other_sessions_saved(self):
+        self.saved_notebook(('Alpha', 'first note text', ['work']))
+        first, second = self.open_notebook(), self.open_notebook()
+        first.add_tags(first.find_note('alpha'), ['home'])
+        second.add_tags(second.find_note('alpha'), ['urgent'])
+        second.save_notes()
+        first.load_notes()
+
+        self.assertEqual(first.find_note('alpha').tags, ['work', 'urgent'])
+
+    def test_queries_see_unsaved_changes(self):
+        notebook = self.saved_notebook(('Alpha', 'about the garden', ['home']), ('Beta', 'about work', ['work']),
+                                       ('Gamma', 'nothing here', ['home', 'work']))
+        notebook.delete_note('Beta')
+        self.add_notes(notebook, ('Delta', 'more work to do', ['work', 'urgent']))
+        notebook.add_tags(notebook.find_note('alpha'), ['Urgent'])
+
+        self.assertEqual(self.titles(notebook.notes), ['Alpha', 'Gamma', 'Delta'])
+        self.assertEqual(len(notebook.notes), 3)
+        self.assertIsNone(notebook.find_note('beta'))
+        self.assertEqual(self.titles(notebook.search_notes('work')), ['Gamma', 'Delta'])
+        self.assertEqual(self.titles(notebook.sort_notes('urgent')), ['Alpha', 'Delta', 'Gamma'])
+        self.assertEqual(self.titles(notebook.notes_with_tags(['urgent'])), ['Alpha', 'Delta'])
+        self.assertEqual(notebook.tag_counts(), [('home', 2), ('urgent', 2), ('work', 2)])
+        self.assertEqual(notebook.related_tags('urgent'), [('home', 1), ('work', 1)])
+
+        notebook.save_notes()
+        self.assertEqual(self.titles(self.open_notebook().notes), ['Alpha', 'Gamma', 'Delta'])
+        self.assertEqual(self.open_notebook().tag_counts(), [('home', 2), ('urgent', 2), ('work', 2)])
+
+    def test_tags_of_a_new_note_differing_in_case_are_one_tag(self):
+        notebook = self.saved_notebook(('Alpha', 'first note text', ['Work', 'work', 'home', 'WORK']))
+
+        self.assertEqual(notebook.find_note('alpha').tags, ['Work', 'home'])
+        self.assertEqual(notebook.tag_counts(), [('home', 1), ('work', 1)])
+        self.assertEqual(self.open_notebook().find_note('alpha').tags, ['Work', 'home'])
+
+
+if __name__ == '__main__':
+    unittest.main()
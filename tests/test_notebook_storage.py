@@ -0,0 +1,108 @@
+from contextlib import redirect_stdout
+import io
+import unittest
+from unittest import mock
+
+from note_book import Note, Notebook
+from tests.support import TempDirTestCase
+
+
+class NotebookStorageTest(TempDirTestCase):
+
+    def open_notebook(self):
+        with redirect_stdout(io.StringIO()):
+            notebook = Notebook(self.path('notes.json'))
+        self.addCleanup(self.wait_for_compaction, notebook)
+        return notebook
+
+    @staticmethod
+    def wait_for_compaction(notebook):
+        if notebook._compactor is not None:
+            notebook._compactor.join()
+
+    @staticmethod
+    def add_notes(notebook, *titles):
+        with redirect_stdout(io.StringIO()):
+            for title in titles:
+                notebook.add_note(Note(title, f'content of {title}', [title.lower()]))
+
+    @staticmethod
+    def titles(notebook):
+        return [note.title for note in notebook.notes]
+
+
+# Sessions of the same notes.json merge each other's saves
+class NotebookMergeTest(NotebookStorageTest):
+
+    def test_saves_of_two_sessions_are_merged(self):
+        first, second = self.open_notebook(), self.open_notebook()
+        self.add_notes(first, 'Alpha')
+        first.save_notes()
+        self.add_notes(second, 'Beta')
+        second.save_notes()
+        self.add_notes(first, 'Gamma')
+        first.save_notes()
+
+        self.assertEqual(self.titles(first), ['Alpha', 'Gamma', 'Beta'])
+        self.assertEqual(self.titles(self.open_notebook()), ['Alpha', 'Beta', 'Gamma'])
+
+
+class NotebookJournalTest(NotebookStorageTest):
+
+    def test_saved_notebook_keeps_the_order(self):
+        titles = [f'Note {number}' for number in range(30, 0, -1)]
+        notebook = self.open_notebook()
+
+        with mock.patch('note_book.JOURNAL_COMPACT_MIN', 0):
+            self.add_notes(notebook, *titles)
+            notebook.save_notes()
+            self.wait_for_compaction(notebook)
+
+        notebook.delete_note('Note 30')
+        self.add_notes(notebook, 'Note 30')
+        notebook.save_notes()
+
+        self.assertEqual(self.titles(self.open_notebook()), titles[1:] + ['Note 30'])
+
+
+# A running session picks up the notes other sessions saved by polling the files
+class NotebookRefreshTest(NotebookStorageTest):
+
+    def test_refresh_picks_up_saved_notes(self):
+        first, second = self.open_notebook(), self.open_notebook()
+        self.add_notes(second, 'Beta')
+        second.save_notes()
+
+        self.assertTrue(first.refresh_notes())
+        self.assertEqual(self.titles(first), ['Beta'])
+        self.assertFalse(first.refresh_notes())
+
+    def test_refresh_keeps_unsaved_notes_while_the_file_is_written(self):
+        notebook = self.open_notebook()
+        self.add_notes(notebook, 'Alpha')
+
+        with open(notebook.filename, 'w') as writer:
+            writer.write('[{"title": "Be')
+
+        self.assertFalse(notebook.refresh_notes())
+        self.assertEqual(self.titles(notebook), ['Alpha'])
+
+    def test_refresh_ignores_the_compaction_of_the_session(self):
+        notebook = self.open_notebook()
+        self.add_notes(notebook, 'Alpha', 'Beta')
+        notebook.save_notes()
+        is_file_changed = notebook._is_file_changed
+
+        def compacted_meanwhile():
+            # the check without the lock sees the file rewritten, the compaction finishes before refresh takes the lock
+            notebook._is_file_changed = is_file_changed
+            notebook._compact()
+            return True
+
+        notebook._is_file_changed = compacted_meanwhile
+        self.assertFalse(notebook.refresh_notes())
+        self.assertEqual(self.titles(notebook), ['Alpha', 'Beta'])
+
+
+if __name__ == '__main__':
+    unittest.main()